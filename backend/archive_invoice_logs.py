@@ -0,0 +1,43 @@
+"""Archive and delete invoice logs older than the retention period.
+
+Logs created more than --days days ago (INVOICE_LOG_RETENTION_DAYS, default
+90) are appended to a gzipped NDJSON file in --archive-dir and removed from
+the database. Run it from cron; an interrupted run can be started again.
+
+Usage (from backend/):
+    python archive_invoice_logs.py [--days 90] [--archive-dir archive] [--no-archive]
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import Session
+
+from models.database import get_write_engine
+from services.invoice_logs import archive_invoice_logs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and delete old invoice logs.")
+    parser.add_argument(
+        "--days", type=int, default=int(os.getenv("INVOICE_LOG_RETENTION_DAYS", "90")),
+        help="keep logs from the last DAYS days (default: INVOICE_LOG_RETENTION_DAYS or 90)"
+    )
+    parser.add_argument(
+        "--archive-dir", type=Path, default=Path(os.getenv("INVOICE_LOG_ARCHIVE_DIR", "archive")),
+        help="directory for the .ndjson.gz archive files (default: archive)"
+    )
+    parser.add_argument("--no-archive", action="store_true", help="delete old logs without archiving them")
+    args = parser.parse_args()
+
+    before = datetime.utcnow() - timedelta(days=args.days)
+    with Session(get_write_engine()) as db:
+        archived = archive_invoice_logs(db, before, None if args.no_archive else args.archive_dir)
+    where = "deleted" if args.no_archive else f"moved to {args.archive_dir}"
+    print(f"✅ {archived} invoice logs from before {before:%Y-%m-%d %H:%M} {where}.")
+
+
+if __name__ == "__main__":
+    main()
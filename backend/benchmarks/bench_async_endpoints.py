@@ -0,0 +1,175 @@
+"""Benchmark: product lookup latency while reports run concurrently.
+
+Serves the app from a separate uvicorn process. A few clients request a
+month of daily-sales (with the order list) back to back while another one
+looks up products, and the lookup and report p50/p99 are recorded. Three
+ways of running the same queries are compared:
+
+- blocking:   async def handlers calling the sync Session directly, as the
+              endpoints did before, which stalls the event loop per query
+- threadpool: run_db() without an async engine (DB_ASYNC=false)
+- async:      run_db() on the aiosqlite engine
+
+Run from the backend directory:
+    python benchmarks/bench_async_endpoints.py [--lookups 300] [--report-clients 2]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+if "--serve" not in sys.argv:
+    _tmp = tempfile.mkdtemp(prefix="pos-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+os.environ["OUTBOX_WORKER_ENABLED"] = "false"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from models.database import get_engine  # noqa: E402
+from models.models import Order, Product, create_schema  # noqa: E402
+
+END = date.today()
+PRODUCTS = 100
+
+
+def serve(port: int):
+    """Server side: the app plus the blocking variants of the two endpoints."""
+    import uvicorn
+
+    import app as api
+    from services.product_cache import product_cache
+
+    @api.app.get("/bench/blocking/reports/daily-sales")
+    async def blocking_daily_sales(start_date: date, end_date: date):
+        with Session(get_engine()) as db:
+            return api.daily_sales_report(db, start_date, end_date, True)
+
+    @api.app.get("/bench/blocking/products/{product_id}")
+    async def blocking_get_product(product_id: int):
+        with Session(get_engine()) as db:
+            return product_cache.get(db, product_id)
+
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def start_server(db_async: bool):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {**os.environ, "DB_ASYNC": "true" if db_async else "false"}
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(port)], cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(base_url + "/", timeout=1)
+            return proc, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("app server did not start")
+
+
+def seed(orders_per_day: int):
+    engine = get_engine()
+    create_schema(engine)
+    with Session(engine) as db:
+        db.exec(insert(Product), params=[
+            {"name": f"Item {i}", "price": 10.0, "stock": 1000, "version": 0} for i in range(PRODUCTS)
+        ])
+        for day in range(90):
+            db.exec(insert(Order), params=[
+                {"product_id": 1 + i % PRODUCTS, "quantity": 1, "total_price": 10.0,
+                 "order_date": END - timedelta(days=day)}
+                for i in range(orders_per_day)
+            ])
+        db.commit()
+
+
+async def run(mode: str, base_url: str, prefix: str, lookups: int, report_clients: int):
+    report_params = {"start_date": str(END - timedelta(days=29)), "end_date": str(END)}
+    lookup_times, report_times = [], []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        login = await client.post("/login", json={"username": "admin", "password": "password"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        # Warm up: open the pool's connections and fill the product cache
+        await asyncio.gather(*(client.get(f"{prefix}/products/{1 + i % PRODUCTS}") for i in range(PRODUCTS)))
+        await asyncio.gather(*(
+            client.get(f"{prefix}/reports/daily-sales", params=report_params) for _ in range(report_clients)
+        ))
+
+        done = asyncio.Event()
+
+        async def report_loop():
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.get(f"{prefix}/reports/daily-sales", params=report_params)
+                response.raise_for_status()
+                report_times.append(time.perf_counter() - start)
+
+        async def lookup_loop():
+            for i in range(lookups):
+                start = time.perf_counter()
+                response = await client.get(f"{prefix}/products/{1 + i % PRODUCTS}")
+                response.raise_for_status()
+                lookup_times.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+            done.set()
+
+        await asyncio.gather(lookup_loop(), *(report_loop() for _ in range(report_clients)))
+
+    def ms(samples, pct):
+        return statistics.quantiles(samples, n=100)[pct - 1] * 1000
+
+    print(
+        f"{mode:<11} lookup p50 {ms(lookup_times, 50):>7.1f}ms p99 {ms(lookup_times, 99):>7.1f}ms  "
+        f"report p50 {ms(report_times, 50):>7.1f}ms p99 {ms(report_times, 99):>7.1f}ms  "
+        f"({len(report_times)} reports)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--report-clients", type=int, default=2, help="clients requesting reports back to back")
+    parser.add_argument("--orders-per-day", type=int, default=50)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port)
+        return
+
+    logging.disable(logging.WARNING)
+    seed(args.orders_per_day)
+    print(f"{args.lookups} product lookups while {args.report_clients} clients request 30-day daily-sales reports")
+    runs = [("blocking", False, "/bench/blocking"), ("threadpool", False, "/api"), ("async", True, "/api")]
+    for mode, db_async, prefix in runs:
+        proc, base_url = start_server(db_async)
+        try:
+            asyncio.run(run(mode, base_url, prefix, args.lookups, args.report_clients))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
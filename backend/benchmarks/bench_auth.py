@@ -0,0 +1,85 @@
+"""Benchmark: bearer-token validation cost per authenticated request.
+
+Measures, for one token reused across requests as terminals do:
+  - the validation call on its own: the old validate_token (os.getenv plus a
+    full HS256 decode every time) vs verify_token() with the token cache
+  - a minimal protected endpoint served in-process, with the old sync
+    dependency (run in the threadpool) vs the cached async one
+
+Run from the backend directory:
+    python benchmarks/bench_auth.py [--calls 50000] [--requests 3000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import httpx  # noqa: E402
+import jwt  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+
+from services.auth import create_token, oauth2_scheme, validate_token, verify_token  # noqa: E402
+
+
+def legacy_validate(token: str = Depends(oauth2_scheme)):
+    try:
+        return jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+
+
+def measure_calls(name: str, fn, token: str, calls: int):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(token)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {elapsed / calls * 1e6:>8.2f} us per call")
+
+
+async def measure_requests(name: str, app: FastAPI, token: str, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/protected", headers=headers)
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/protected", headers=headers)
+            response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    print(f"{name:<22} {elapsed / requests * 1e6:>8.1f} us per request")
+
+
+def protected_app(dependency) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/protected")
+    async def protected(payload: dict = Depends(dependency)):
+        return {"sub": payload["sub"]}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    token = create_token("admin")
+
+    measure_calls("decode every call", legacy_validate, token, args.calls)
+    measure_calls("cached", verify_token, token, args.calls)
+    asyncio.run(measure_requests("endpoint, legacy", protected_app(legacy_validate), token, args.requests))
+    asyncio.run(measure_requests("endpoint, cached", protected_app(validate_token), token, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark: per-order latency of create_order, legacy loop vs set-based path.
+
+Compares the original per-line implementation (one db.get() per cart line,
+stock decremented in Python) with services.orders.place_order (one IN query,
+one conditional UPDATE, one bulk INSERT) at 1, 10 and 50 lines per order.
+
+Run from the backend directory:
+    python benchmarks/bench_create_order.py [--orders 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="pos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+from pydantic import BaseModel  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from models.database import make_engine  # noqa: E402
+
+from models.models import Order, Product  # noqa: E402
+from services.orders import place_order  # noqa: E402
+from services.product_cache import product_cache  # noqa: E402
+
+LINE_COUNTS = (1, 10, 50)
+
+
+class Line(BaseModel):
+    product_id: int
+    quantity: int
+
+
+def legacy_create_order(db: Session, items):
+    """The create_order loop as it was before OrderItem existed."""
+    total_price = 0
+    for item in items:
+        product = db.get(Product, item.product_id)
+        if product.stock < item.quantity:
+            raise ValueError(f"Not enough stock for {product.name}")
+        total_price += product.price * item.quantity
+        product.stock -= item.quantity
+        db.add(product)
+    db_order = Order(
+        product_id=items[0].product_id,
+        quantity=sum(item.quantity for item in items),
+        total_price=total_price,
+        order_date=date.today(),
+    )
+    db.add(db_order)
+    db.commit()
+    db.refresh(db_order)
+    return db_order
+
+
+def set_based_create_order(db: Session, items):
+    """What POST /api/orders does now: the body is built before the commit."""
+    body = place_order(db, items).model_dump(mode="json")
+    db.commit()
+    return body
+
+
+def seeded_engine(path: Path):
+    engine = make_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(
+            Product(name=f"Item {i}", price=10.0 + i, stock=10_000_000) for i in range(max(LINE_COUNTS))
+        )
+        db.commit()
+    return engine
+
+
+def run(fn, engine, lines: int, orders: int) -> float:
+    product_cache.clear()  # each measurement uses a fresh database
+    items = [Line(product_id=i + 1, quantity=1) for i in range(lines)]
+    with Session(engine) as db:
+        fn(db, items)  # warm-up
+    start = time.perf_counter()
+    for _ in range(orders):
+        with Session(engine) as db:
+            fn(db, items)
+    return (time.perf_counter() - start) / orders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200, help="orders per measurement")
+    args = parser.parse_args()
+
+    print(f"{'lines':>5}  {'legacy ms':>10}  {'set-based ms':>12}  {'speedup':>7}")
+    for lines in LINE_COUNTS:
+        results = {}
+        for name, fn in (("legacy", legacy_create_order), ("set", set_based_create_order)):
+            engine = seeded_engine(Path(_tmp) / f"{name}-{lines}.db")
+            results[name] = run(fn, engine, lines, args.orders)
+            engine.dispose()
+        print(
+            f"{lines:>5}  {results['legacy']:>10.3f}  {results['set']:>12.3f}  "
+            f"{results['legacy'] / results['set']:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
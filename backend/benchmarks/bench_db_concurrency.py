@@ -0,0 +1,124 @@
+"""Benchmark: mixed reads and create_order writes across worker threads.
+
+Runs the same workload against SQLite with its default settings (rollback
+journal, synchronous=FULL, plain BEGIN for writes) and with what
+models.database sets up (WAL, synchronous=NORMAL, busy_timeout, cache_size,
+mmap_size, BEGIN IMMEDIATE for write sessions). Each worker
+thread loops over a product read, a paged product list and, every
+--write-every operations, a place_order() commit.
+
+Run from the backend directory:
+    python benchmarks/bench_db_concurrency.py [--threads 8] [--ops 300]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="pos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+from fastapi import HTTPException  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from models.database import make_engine, sqlite_pragmas, writer  # noqa: E402
+from models.models import Product  # noqa: E402
+from services.orders import place_order  # noqa: E402
+from services.product_cache import product_cache  # noqa: E402
+
+PRODUCTS = 200
+# name: (pragmas, BEGIN IMMEDIATE for writes)
+CONFIGS = {
+    "default": ({"journal_mode": "DELETE", "synchronous": "FULL"}, False),
+    "tuned": (sqlite_pragmas(), True),
+}
+
+
+class Line(BaseModel):
+    product_id: int
+    quantity: int
+
+
+def seeded_engine(name: str, pragmas: dict):
+    engine = make_engine(f"sqlite:///{_tmp}/{name}.db", pragmas=pragmas)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(Product(name=f"Item {i}", price=10.0, stock=10_000_000) for i in range(PRODUCTS))
+        db.commit()
+    return engine
+
+
+def worker(engine, write_engine, seed: int, ops: int, write_every: int, reads: list, writes: list, errors: list):
+    rng = random.Random(seed)
+    for op in range(ops):
+        start = time.perf_counter()
+        is_write = op % write_every == 0
+        try:
+            with Session(write_engine if is_write else engine) as db:
+                if is_write:
+                    items = [Line(product_id=rng.randint(1, PRODUCTS), quantity=1) for _ in range(3)]
+                    place_order(db, items)
+                    db.commit()
+                    writes.append(time.perf_counter() - start)
+                elif op % 2:
+                    db.get(Product, rng.randint(1, PRODUCTS))
+                    reads.append(time.perf_counter() - start)
+                else:
+                    offset = rng.randint(0, PRODUCTS - 50)
+                    db.exec(select(Product).where(Product.id > offset).order_by(Product.id).limit(50)).all()
+                    reads.append(time.perf_counter() - start)
+        except (OperationalError, HTTPException) as e:
+            errors.append(type(e).__name__)
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    return statistics.quantiles(samples, n=100)[int(pct) - 1] if len(samples) > 1 else samples[0]
+
+
+def run(name: str, pragmas: dict, immediate: bool, threads: int, ops: int, write_every: int):
+    engine = seeded_engine(name, pragmas)
+    write_engine = writer(engine) if immediate else engine
+    product_cache.clear()
+    reads, writes, errors = [], [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for t in range(threads):
+            pool.submit(worker, engine, write_engine, t, ops, write_every, reads, writes, errors)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    total = len(reads) + len(writes)
+    print(
+        f"{name:<8} {total / elapsed:>8.0f} ops/s  "
+        f"read p50 {percentile(reads, 50) * 1000:>6.2f}ms p99 {percentile(reads, 99) * 1000:>7.2f}ms  "
+        f"write p50 {percentile(writes, 50) * 1000:>6.2f}ms p99 {percentile(writes, 99) * 1000:>7.2f}ms  "
+        f"errors {len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=300, help="operations per thread")
+    parser.add_argument("--write-every", type=int, default=5, help="one write per N operations")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.ops} ops, 1 in {args.write_every} is a create_order")
+    for name, (pragmas, immediate) in CONFIGS.items():
+        run(name, pragmas, immediate, args.threads, args.ops, args.write_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: peak memory and time to first byte of an orders export.
+
+Compares building the whole range as a list of dicts (what pulling
+daily-sales JSON day by day amounts to) with services.exports.stream_export
+for a day, a month and a year of orders.
+
+Run from the backend directory:
+    python benchmarks/bench_export.py [--orders-per-day 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="pos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from models.database import get_engine  # noqa: E402
+from models.models import Order, Product, create_schema  # noqa: E402
+from services.exports import stream_export  # noqa: E402
+
+END = date(2025, 1, 1)
+RANGES = (("day", 1), ("month", 30), ("year", 365))
+
+
+def seed(engine, orders_per_day: int):
+    with Session(engine) as db:
+        db.exec(insert(Product), params=[{"name": "Product", "price": 10.0, "stock": 1000, "version": 0}])
+        for day in range(365):
+            db.exec(insert(Order), params=[
+                {"product_id": 1, "quantity": 1, "total_price": 10.0, "order_date": END - timedelta(days=day)}
+            ] * orders_per_day)
+        db.commit()
+
+
+def orders_query(days: int):
+    return (
+        select(Order.id, Order.order_date, Order.product_id, Order.quantity, Order.total_price)
+        .where(Order.order_date > END - timedelta(days=days), Order.order_date <= END)
+        .order_by(Order.order_date, Order.id)
+    )
+
+
+def in_memory_export(engine, days: int):
+    with Session(engine) as db:
+        rows = db.exec(select(Order).where(Order.order_date > END - timedelta(days=days))).all()
+        body = json.dumps([{"id": o.id, "product_id": o.product_id, "quantity": o.quantity,
+                            "total_price": o.total_price, "order_date": str(o.order_date)} for o in rows])
+    yield body
+
+
+def measure(chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders-per-day", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    create_schema(engine)
+    seed(engine, args.orders_per_day)
+
+    print(f"{'range':<6} {'method':<10} {'rows':>8} {'first byte':>11} {'total':>9} {'peak mem':>10}")
+    for label, days in RANGES:
+        rows = days * args.orders_per_day
+        runs = [
+            ("in-memory", in_memory_export(engine, days)),
+            ("csv", stream_export(engine, orders_query(days), "csv", args.chunk_size)),
+            ("ndjson", stream_export(engine, orders_query(days), "ndjson", args.chunk_size)),
+        ]
+        for method, chunks in runs:
+            first, total, peak, _ = measure(chunks)
+            print(f"{label:<6} {method:<10} {rows:>8} {first * 1000:>9.1f}ms {total * 1000:>7.0f}ms {peak / 1e6:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark: logging cost on the request thread for an invoice submission.
+
+Times the two payload log lines of POST /api/invoices/submit as seen by the
+calling thread:
+  - legacy:        f-string json.dumps(indent=2) at INFO through a FileHandler
+  - queued:        log_payload() at DEBUG with the level at INFO (the default)
+  - queued+debug:  log_payload() with DEBUG on and 10% sampling
+The queued variants write through the app's RecordQueueHandler and
+RecordQueueListener, so records are formatted on the listener thread.
+
+Run from the backend directory:
+    python benchmarks/bench_logging.py [--calls 20000]
+"""
+
+import argparse
+import json
+import logging
+import queue
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services import logging_config  # noqa: E402
+from services.logging_config import LOG_FORMAT, RecordQueueHandler, RecordQueueListener, log_payload  # noqa: E402
+
+INVOICE = {
+    "tpin": "1000000000", "bhfId": "000", "cisInvcNo": "INV-001", "salesTyCd": "N", "rcptTyCd": "S",
+    "pmtTyCd": "01", "cfmDt": "20250101120000", "salesDt": "20250101", "totItemCnt": 10,
+    "itemList": [
+        {"itemSeq": i, "itemCd": f"PROD{i:03d}", "itemNm": f"Item {i}", "qty": 2, "prc": 10.0, "totAmt": 20.0}
+        for i in range(10)
+    ],
+}
+
+
+def file_handler(path: Path) -> logging.Handler:
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def legacy(logger, calls):
+    for _ in range(calls):
+        logger.info(f"Original invoice_data: {json.dumps(INVOICE, indent=2)}")
+        logger.info(f"Transformed data: {json.dumps(INVOICE, indent=2)}")
+
+
+def queued(logger, calls):
+    for _ in range(calls):
+        log_payload(logger, "Original invoice_data", INVOICE)
+        log_payload(logger, "Transformed data", INVOICE)
+
+
+def measure(name, fn, logger, calls):
+    start = time.perf_counter()
+    fn(logger, calls)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {elapsed / calls * 1e6:>8.1f} us per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    tmp = Path(tempfile.mkdtemp(prefix="pos-bench-"))
+
+    logger = logging.getLogger("bench.legacy")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(file_handler(tmp / "legacy.log"))
+    measure("legacy", legacy, logger, args.calls)
+
+    log_queue = queue.SimpleQueue()
+    listener = RecordQueueListener(log_queue, file_handler(tmp / "queued.log"))
+    listener.start()
+    logger = logging.getLogger("bench.queued")
+    logger.propagate = False
+    logger.addHandler(RecordQueueHandler(log_queue))
+
+    logger.setLevel(logging.INFO)
+    measure("queued", queued, logger, args.calls)
+    logger.setLevel(logging.DEBUG)
+    logging_config.PAYLOAD_SAMPLE_RATE = 0.1
+    measure("queued+debug", queued, logger, args.calls)
+    listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: cost of the request metrics middleware and query instrumentation.
+
+Measures, taking the best of --rounds runs so noise from the event loop and
+threadpool does not swamp the differences:
+  - a minimal async endpoint served in-process, with and without
+    MetricsMiddleware in front of it
+  - a SQLite statement executed in a loop, on an engine with and without
+    instrument_engine()
+  - rendering /metrics afterwards
+
+Run from the backend directory:
+    python benchmarks/bench_metrics.py [--requests 3000] [--queries 20000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from models.database import make_engine  # noqa: E402
+from services.metrics import MetricsMiddleware, instrument_engine, registry  # noqa: E402
+
+
+def item_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def time_requests(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(50):
+            await client.get(f"/items/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(f"/items/{i}")
+            response.raise_for_status()
+        return (time.perf_counter() - start) / requests
+
+
+def time_queries(engine, queries: int) -> float:
+    statement = text("SELECT :v")
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for i in range(queries):
+            conn.execute(statement, {"v": i}).scalar()
+        return (time.perf_counter() - start) / queries
+
+
+def report(name: str, plain: float, instrumented: float):
+    print(f"{name:<10} {plain * 1e6:>8.1f} us plain  {instrumented * 1e6:>8.1f} us instrumented"
+          f"  (+{(instrumented - plain) * 1e6:.1f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    plain_app, instrumented_app = item_app(False), item_app(True)
+    report(
+        "request",
+        min(asyncio.run(time_requests(plain_app, args.requests)) for _ in range(args.rounds)),
+        min(asyncio.run(time_requests(instrumented_app, args.requests)) for _ in range(args.rounds)),
+    )
+
+    plain_engine, instrumented_engine = make_engine("sqlite://"), make_engine("sqlite://")
+    instrument_engine(instrumented_engine, "bench")
+    report(
+        "query",
+        min(time_queries(plain_engine, args.queries) for _ in range(args.rounds)),
+        min(time_queries(instrumented_engine, args.queries) for _ in range(args.rounds)),
+    )
+
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"render /metrics  {(time.perf_counter() - start) * 1e3:.2f} ms ({len(body.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
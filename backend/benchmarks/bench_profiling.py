@@ -0,0 +1,80 @@
+"""Benchmark: request overhead of the profiling hooks.
+
+Serves a minimal sync endpoint in-process and reports the time per request
+(best of --rounds runs) for:
+  - plain APIRoutes, which is what the app uses while profiling is disabled
+  - ProfiledRoute with a PROFILE_SECRET set but no X-Profile header, i.e.
+    armed but idle
+  - every request profiled with cProfile, and with the stack sampler
+
+Run from the backend directory:
+    python benchmarks/bench_profiling.py [--requests 2000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import services.profiling as profiling  # noqa: E402
+from services.profiling import ProfiledRoute, Profiler  # noqa: E402
+
+
+def item_app(profiled: bool) -> FastAPI:
+    app = FastAPI()
+    if profiled:
+        app.router.route_class = ProfiledRoute
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id, "total": sum(range(200))}
+
+    return app
+
+
+async def time_requests(app: FastAPI, requests: int, headers: dict) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(20):
+            await client.get(f"/items/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(f"/items/{i}", headers=headers)
+            response.raise_for_status()
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    directory = Path(tempfile.mkdtemp())
+
+    def best(app, headers=None, requests=args.requests):
+        return min(asyncio.run(time_requests(app, requests, headers or {})) for _ in range(args.rounds))
+
+    plain = best(item_app(False))
+    print(f"{'plain routes':<22} {plain * 1e6:>8.1f} us per request")
+
+    profiling.profiler = Profiler(directory, secret="bench")
+    idle = best(item_app(True))
+    print(f"{'armed, not profiling':<22} {idle * 1e6:>8.1f} us per request (+{(idle - plain) * 1e6:.1f} us)")
+
+    for mode in ("cprofile", "sample"):
+        profiling.profiler = Profiler(directory, mode=mode, secret="bench", max_files=10)
+        # Fewer requests: each one writes a profile file
+        profiled = best(item_app(True), {"X-Profile": "bench"}, max(args.requests // 10, 50))
+        print(f"{'profiled, ' + mode:<22} {profiled * 1e6:>8.1f} us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Benchmark: serialisation CPU of 1k-row list and report responses.
+
+Seeds a day with --rows products, orders, invoices and invoice logs, then
+for each of the four hot read endpoints reports:
+
+- encode: CPU to turn the endpoint's rows into the response body, the way
+          FastAPI did it before (ORM objects or dicts through
+          jsonable_encoder and the stdlib JSONResponse, stored responses
+          json.loads-ed first) and the way it is done now (plain row dicts,
+          stored responses as orjson Fragments, ORJSONResponse)
+- request: process CPU and wall time per request through the whole app,
+           run in-process with TestClient
+
+Run from the backend directory:
+    python benchmarks/bench_serialization.py [--rows 1000] [--requests 50]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="pos-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+os.environ["RATELIMIT_STORAGE_URL"] = "memory://"
+os.environ["API_RATE_LIMIT"] = "1000000/minute"
+os.environ["OUTBOX_WORKER_ENABLED"] = "false"
+os.environ["DB_ASYNC"] = "false"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+import app as api  # noqa: E402
+from models.database import get_engine, get_write_engine  # noqa: E402
+from models.models import Invoice, InvoiceLog, Order, Product, create_schema  # noqa: E402
+from services.auth import create_token  # noqa: E402
+from services.invoice_logs import invoice_log_row, response_fragment, response_text  # noqa: E402
+from services.rollups import rebuild_rollups  # noqa: E402
+
+DAY = date(2025, 1, 1)
+
+
+def authority_response(n: int) -> dict:
+    # Shaped like a ZRA salesinvoice answer
+    return {
+        "resultCd": "000",
+        "resultMsg": "It is succeeded",
+        "resultDt": "20250101120000",
+        "data": {
+            "rcptNo": n,
+            "intrlData": f"LS{n:018d}QZ7J4XCY2D",
+            "rcptSign": f"HX{n:014d}PRDL",
+            "totRcptNo": n,
+            "vsdcRcptPbctDate": "20250101120000",
+            "sdcId": "SDC0010000647",
+            "mrcNo": "WIS01006230",
+        },
+    }
+
+
+def seed(rows: int):
+    engine = get_write_engine()
+    with Session(engine) as db:
+        db.exec(insert(Product), params=[
+            {"name": f"Dish {i}", "description": f"House dish number {i}", "price": 10.0 + i % 90, "stock": 1000, "version": i}
+            for i in range(1, rows + 1)
+        ])
+        db.exec(insert(Order), params=[
+            {"product_id": i, "quantity": 1 + i % 3, "total_price": 25.0 + i % 40, "order_date": DAY}
+            for i in range(1, rows + 1)
+        ])
+        db.exec(insert(Invoice), params=[
+            {"order_id": i, "cis_invc_no": f"INV-{i:06d}", "total_amount": 25.0 + i % 40, "tax_amount": 3.45, "invoice_date": DAY}
+            for i in range(1, rows + 1)
+        ])
+        created_at = datetime(2025, 1, 1, 12)
+        db.exec(insert(InvoiceLog), params=[
+            {**invoice_log_row(f"INV-{i:06d}", authority_response(i)), "created_at": created_at}
+            for i in range(1, rows + 1)
+        ])
+        rebuild_rollups(db)
+        db.commit()
+
+
+def fastapi_default(content) -> bytes:
+    """A plain return before: jsonable_encoder, then the stdlib JSONResponse."""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def encoders(rows: int) -> dict:
+    """(before, after) body builders per endpoint, each reading its own rows."""
+    engine = get_engine()
+    db = Session(engine)
+    limit = min(rows, api.MAX_PAGE_SIZE)
+    products = db.exec(select(Product).order_by(Product.id).limit(limit)).all()
+    product_rows = db.connection().execute(
+        select(*(getattr(Product, c) for c in api.PRODUCT_FIELDS)).order_by(Product.id).limit(limit)
+    )
+    log_rows = db.connection().execute(
+        select(*(getattr(InvoiceLog, c) for c in api.INVOICE_LOG_FIELDS)).order_by(InvoiceLog.id).limit(limit)
+    )
+    daily = api.daily_sales_report(db, DAY, DAY, True)
+    tax = api.tax_report_data(db, DAY, DAY, True)
+    db.close()
+
+    # Buffered, so each run can read the rows again from the start
+    product_rows, log_rows = product_rows.freeze(), log_rows.freeze()
+
+    def logs_before():
+        items = []
+        for r in log_rows():
+            item = dict(r._mapping)
+            item["response"] = json.loads(response_text(r.response))
+            items.append(item)
+        return fastapi_default(items)
+
+    def logs_after():
+        items = api.row_dicts(log_rows())
+        for item in items:
+            item["response"] = response_fragment(item["response"])
+        return ORJSONResponse(items).body
+
+    return {
+        "/api/products": (
+            lambda: fastapi_default(products),
+            lambda: ORJSONResponse(api.row_dicts(product_rows())).body,
+        ),
+        "/api/invoices/logs": (logs_before, logs_after),
+        "/api/reports/daily-sales": (lambda: fastapi_default(daily), lambda: ORJSONResponse(daily).body),
+        "/api/reports/tax": (lambda: fastapi_default(tax), lambda: ORJSONResponse(tax).body),
+    }
+
+
+def cpu_ms(fn, runs: int) -> float:
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def per_request(client: TestClient, url: str, headers: dict, runs: int) -> tuple[float, float, int]:
+    # identity, so GZipMiddleware stays out of the numbers
+    headers = {**headers, "Accept-Encoding": "identity"}
+    size = len(client.get(url, headers=headers).content)
+    cpu = []
+    wall = []
+    for _ in range(runs):
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        client.get(url, headers=headers).raise_for_status()
+        cpu.append((time.process_time() - start_cpu) * 1000)
+        wall.append((time.perf_counter() - start_wall) * 1000)
+    return statistics.median(cpu), statistics.median(wall), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    create_schema(get_engine())
+    seed(args.rows)
+
+    print(f"{args.rows} rows per response, median CPU of {args.requests} runs")
+    print(f"{'endpoint':<26} {'encode before':>14} {'encode after':>13} {'speedup':>8}")
+    for path, (before, after) in encoders(args.rows).items():
+        if json.loads(before()) != json.loads(after()):
+            raise SystemExit(f"{path}: the two encodings differ")
+        old, new = cpu_ms(before, args.requests), cpu_ms(after, args.requests)
+        print(f"{path:<26} {old:>12.2f}ms {new:>11.2f}ms {old / new:>7.1f}x")
+
+    limit = min(args.rows, api.MAX_PAGE_SIZE)
+    urls = {
+        "/api/products": f"/api/products?limit={limit}",
+        "/api/invoices/logs": f"/api/invoices/logs?limit={limit}",
+        "/api/reports/daily-sales": f"/api/reports/daily-sales?date_str={DAY}",
+        "/api/reports/tax": f"/api/reports/tax?date_str={DAY}",
+    }
+    headers = {"Authorization": f"Bearer {create_token('admin')}"}
+    print()
+    print(f"{'endpoint':<26} {'CPU/request':>12} {'wall':>9} {'body':>9}")
+    with TestClient(api.app) as client:
+        for path, url in urls.items():
+            cpu, wall, size = per_request(client, url, headers, args.requests)
+            print(f"{path:<26} {cpu:>10.2f}ms {wall:>7.2f}ms {size / 1024:>7.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Benchmark: cold start time and memory of the app.
+
+Prepares a SQLite database with `python migrate.py`, then measures, over
+a few runs each:
+
+- import: time to `import app` in a fresh interpreter, and its peak RSS
+- own:    the same with the libraries already imported, which leaves
+          the app's own module-level work (routes, models, setup)
+- ready:  time from launching `uvicorn app:app` until it answers GET /,
+          the delay every worker start and every --reload pays
+- worker RSS once ready, and again after a login and a product list
+
+--backend points at another checkout's backend directory to compare two
+versions, for example one made with `git worktree add /tmp/before HEAD~1`.
+Memory is read from /proc, so RSS is only reported on Linux.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py [--runs 5] [--backend DIR ...]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_PROBE = (
+    "import resource, time\n"
+    "{preload}"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+LIBRARIES = (
+    "fastapi", "fastapi.middleware.cors", "fastapi.middleware.gzip", "sqlmodel", "sqlalchemy.ext.asyncio",
+    "pydantic", "httpx", "requests", "slowapi", "limits", "jwt", "dotenv",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def environment(tmp: str) -> dict:
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp}/startup.db",
+        "RATELIMIT_STORAGE_URL": f"sqlite:///{tmp}/ratelimits.db",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+        "LOG_LEVEL": "WARNING",
+        "PROFILE_DIR": f"{tmp}/profiles",
+    }
+
+
+def measure_import(backend: Path, env: dict, preload: bool = False) -> tuple[float, float]:
+    probe = IMPORT_PROBE.format(preload="".join(f"import {name}\n" for name in LIBRARIES) if preload else "")
+    out = subprocess.run(
+        [sys.executable, "-c", probe], cwd=backend, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    seconds, max_rss_kb = float(out[-2]), int(out[-1])
+    return seconds * 1000, max_rss_kb / 1024
+
+
+def measure_server(backend: Path, env: dict, run: int) -> tuple[float, float, float]:
+    # A fresh counter file per run, or the logins would hit /login's rate limit
+    env = {**env, "RATELIMIT_STORAGE_URL": env["RATELIMIT_STORAGE_URL"].replace(".db", f"-{run}.db")}
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base, timeout=5.0) as client:
+            while True:
+                try:
+                    if client.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError(f"uvicorn exited with {server.returncode} in {backend}")
+                    time.sleep(0.005)
+            ready_ms = (time.perf_counter() - start) * 1000
+            ready_rss = rss_mb(server.pid)
+            token = client.post("/login", json={"username": "admin", "password": "password"}).json()["access_token"]
+            client.get("/api/products", headers={"Authorization": f"Bearer {token}"}).raise_for_status()
+            served_rss = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(10)
+    return ready_ms, ready_rss, served_rss
+
+
+def bench(backend: Path, runs: int) -> dict:
+    tmp = tempfile.mkdtemp(prefix="pos-startup-")
+    env = environment(tmp)
+    subprocess.run([sys.executable, "migrate.py"], cwd=backend, env=env, capture_output=True, check=True)
+    imports = [measure_import(backend, env) for _ in range(runs)]
+    own = [measure_import(backend, env, preload=True)[0] for _ in range(runs)]
+    servers = [measure_server(backend, env, run) for run in range(runs)]
+    return {
+        "import_ms": statistics.median(i[0] for i in imports),
+        "import_rss": statistics.median(i[1] for i in imports),
+        "own_ms": statistics.median(own),
+        "ready_ms": statistics.median(s[0] for s in servers),
+        "ready_rss": statistics.median(s[1] for s in servers),
+        "served_rss": statistics.median(s[2] for s in servers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", type=Path, action="append", help="backend directory to measure (repeatable)")
+    args = parser.parse_args()
+
+    backends = [b.resolve() for b in args.backend] if args.backend else [BACKEND_DIR]
+    print(f"median of {args.runs} runs")
+    print(
+        f"{'backend':<32} {'import ms':>10} {'import MB':>10} {'own ms':>7} "
+        f"{'ready ms':>9} {'ready MB':>9} {'served MB':>10}"
+    )
+    for backend in backends:
+        r = bench(backend, args.runs)
+        print(
+            f"{str(backend)[-32:]:<32} {r['import_ms']:>10.0f} {r['import_rss']:>10.1f} {r['own_ms']:>7.0f} {r['ready_ms']:>9.0f} "
+            f"{r['ready_rss']:>9.1f} {r['served_rss']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark: tax_client submit throughput against backend/mock_tax.py.
+
+Starts the mock tax authority on a local port and measures invoices/second for
+  - legacy:  a new requests.Session + HTTPAdapter per call (the old behaviour)
+  - pooled:  the module-level TaxClient (keep-alive, shared connection pool)
+  - async:   TaxClient.submit_invoice_async on one event loop
+each sequentially and with --concurrency callers in flight.
+
+Run from the backend directory:
+    python benchmarks/bench_tax_client.py [--requests 500] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import sys
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import requests  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+from urllib3.util.retry import Retry  # noqa: E402
+
+from tax_client import TaxClient  # noqa: E402
+
+INVOICE = {"invcNo": "INV-001", "totalAmt": 23.2, "items": [{"itemCd": "PROD001", "qty": 2, "prc": 10.0}]}
+
+
+def legacy_submit(invoice_data, api_url):
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    response = session.post(api_url + '/trnsSales/saveSales', json=invoice_data, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def start_mock_server():
+    """Run mock_tax in its own process so it doesn't share the GIL with the clients."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mock_tax:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    api_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(api_url + "/health", timeout=1)
+            return proc, api_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("mock_tax did not start")
+
+
+def measure_sync(fn, n, concurrency):
+    start = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(n):
+            fn()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda _: fn(), range(n)))
+    return n / (time.perf_counter() - start)
+
+
+async def measure_async(client, api_url, n, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await client.submit_invoice_async(INVOICE, api_url, "1234567890", "000", "DEVICE123")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    proc, api_url = start_mock_server()
+    try:
+        client = TaxClient(pool_maxsize=args.concurrency)
+
+        def pooled():
+            result = client.submit_invoice(INVOICE, api_url, "1234567890", "000", "DEVICE123")
+            assert result.get("status") != "ERROR", result
+
+        print(f"{'client':<8} {'sequential req/s':>17} {f'concurrent({args.concurrency}) req/s':>24}")
+        for name, fn in (("legacy", lambda: legacy_submit(INVOICE, api_url)), ("pooled", pooled)):
+            fn()  # warm-up
+            seq = measure_sync(fn, args.requests, 1)
+            conc = measure_sync(fn, args.requests, args.concurrency)
+            print(f"{name:<8} {seq:>17.1f} {conc:>24.1f}")
+
+        seq = asyncio.run(measure_async(TaxClient(pool_maxsize=args.concurrency), api_url, args.requests, 1))
+        conc = asyncio.run(measure_async(TaxClient(pool_maxsize=args.concurrency), api_url, args.requests, args.concurrency))
+        print(f"{'async':<8} {seq:>17.1f} {conc:>24.1f}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Check that the reporting queries use index range scans, not table scans.
+
+Builds a throwaway SQLite database with a year of orders, invoices and
+invoice logs, runs ANALYZE, then runs EXPLAIN QUERY PLAN on each report
+query and fails if the filtered table is scanned instead of searched
+through the expected index.
+
+Run from the backend directory:
+    python benchmarks/check_report_plans.py [--days 365]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = tempfile.mkdtemp(prefix="pos-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/plans.db"
+
+from sqlalchemy import insert, text  # noqa: E402
+from sqlalchemy.sql import func  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from models.database import get_engine  # noqa: E402
+from models.models import DailySalesRollup, Invoice, InvoiceLog, Order, Product, create_schema  # noqa: E402
+from services.invoice_logs import invoice_log_row  # noqa: E402
+
+END = date(2025, 1, 1)
+
+
+def seed(engine, days: int, orders_per_day: int = 40, products: int = 50):
+    rng = random.Random(1)
+    with Session(engine) as db:
+        db.exec(insert(Product), params=[
+            {"name": f"Product {i}", "price": 10.0, "stock": 1000, "version": 0} for i in range(products)
+        ])
+        orders = []
+        for day in range(days):
+            order_date = END - timedelta(days=day)
+            for _ in range(orders_per_day):
+                orders.append({
+                    "product_id": rng.randint(1, products),
+                    "quantity": 1,
+                    "total_price": 10.0,
+                    "order_date": order_date,
+                })
+        db.exec(insert(Order), params=orders)
+        db.exec(insert(Invoice), params=[
+            {
+                "order_id": i + 1,
+                "cis_invc_no": f"INV-{i}",
+                "total_amount": o["total_price"] * 1.16,
+                "tax_amount": o["total_price"] * 0.16,
+                "invoice_date": o["order_date"],
+            }
+            for i, o in enumerate(orders)
+        ])
+        # One authority response per invoice, about 2% of them rejected
+        db.exec(insert(InvoiceLog), params=[
+            {
+                **invoice_log_row(f"INV-{i}", {"resultCd": "000" if rng.random() > 0.02 else "999"}),
+                "created_at": datetime.combine(o["order_date"], time(12)),
+            }
+            for i, o in enumerate(orders)
+        ])
+        db.exec(insert(DailySalesRollup), params=[
+            {"sales_date": END - timedelta(days=day)} for day in range(days)
+        ])
+        db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def report_queries():
+    """(name, statement, table, index) for each query the reports run."""
+    start, end = END - timedelta(days=6), END
+    return [
+        (
+            "daily-sales orders in range",
+            select(Order).where(Order.order_date >= start, Order.order_date <= end)
+            .order_by(Order.order_date, Order.id),
+            "orders", "ix_orders_order_date",
+        ),
+        (
+            "tax invoices in range",
+            select(Invoice).where(Invoice.invoice_date >= start, Invoice.invoice_date <= end)
+            .order_by(Invoice.invoice_date, Invoice.id),
+            "invoices", "ix_invoices_invoice_date",
+        ),
+        (
+            "one product's orders in range",
+            select(func.sum(Order.quantity), func.sum(Order.total_price))
+            .where(Order.product_id == 7, Order.order_date >= start, Order.order_date <= end),
+            "orders", "ix_orders_product_id_order_date",
+        ),
+        (
+            "invoices of an order",
+            select(Invoice).where(Invoice.order_id == 42),
+            "invoices", "ix_invoices_order_id",
+        ),
+        (
+            "rollup rebuild, orders per day",
+            select(Order.order_date, func.count(Order.id), func.sum(Order.total_price))
+            .where(Order.order_date >= start, Order.order_date <= end)
+            .group_by(Order.order_date),
+            "orders", "ix_orders_order_date",
+        ),
+        (
+            "rollup days in range",
+            select(DailySalesRollup)
+            .where(DailySalesRollup.sales_date >= start, DailySalesRollup.sales_date <= end)
+            .order_by(DailySalesRollup.sales_date),
+            "daily_sales_rollup", "sqlite_autoindex_daily_sales_rollup_1",
+        ),
+        (
+            "failed invoice logs last week",
+            select(InvoiceLog.id, InvoiceLog.cis_invc_no, InvoiceLog.result_code)
+            .where(
+                InvoiceLog.status == "failed",
+                InvoiceLog.created_at >= datetime.combine(start, time.min),
+                InvoiceLog.created_at <= datetime.combine(end, time.max),
+            )
+            .order_by(InvoiceLog.id)
+            .limit(100),
+            "invoice_logs", "ix_invoice_logs_status_created_at",
+        ),
+    ]
+
+
+def explain(conn, stmt) -> list[str]:
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    create_schema(engine)
+    seed(engine, args.days)
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, stmt, table, index in report_queries():
+            plan = explain(conn, stmt)
+            uses_index = any(
+                step.startswith(f"SEARCH {table} USING") and index in step for step in plan
+            )
+            scans_table = any(step.startswith(f"SCAN {table}") for step in plan)
+            ok = uses_index and not scans_table
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            for step in plan:
+                print(f"       {step}")
+
+    if failures:
+        print(f"\n{failures} report queries do not use their index")
+        sys.exit(1)
+    print("\nAll report queries use index range scans")
+
+
+if __name__ == "__main__":
+    main()
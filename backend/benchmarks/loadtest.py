@@ -0,0 +1,422 @@
+"""Load test: replay terminal traffic against the app and report per-endpoint latency.
+
+`run` starts mock_tax.py and the app (uvicorn, --workers processes) on local
+ports against a fresh SQLite database seeded with --products products, or
+targets --url / --database-url instead. It then runs --terminals simulated
+terminals for --duration seconds after a --warmup. Each terminal has its
+own bearer token and connection, and loops over a weighted mix of what the
+tills do:
+
+  catalog_sync        GET /api/products?since=<version> with If-None-Match
+  catalog_page        GET /api/products?limit=500 (a full catalog download)
+  product_lookup      GET /api/products/{id}
+  create_order        POST /api/orders with 1-8 lines
+  submit_invoice      POST /api/invoices/submit (the outbox sends it to mock_tax)
+  report_sales        GET /api/reports/sales
+  report_daily_sales  GET /api/reports/daily-sales?include_orders=false
+  report_tax          GET /api/reports/tax?include_invoices=false
+
+--tax passes simulation settings to mock_tax.py (see its docstring), so
+checkout can be measured against a slow or failing tax authority; the
+mock's own /stats end up in the output too. Throughput, error counts and
+p50/p95/p99 latency per action are printed and written as JSON to --output. The random choices come from --seed, so two
+runs send the same sequence of requests per terminal.
+
+`compare` checks a result file against a baseline and exits with status 1
+if an action's p95 or p99 latency rose, or its throughput fell, by more
+than --threshold (10%). `run --baseline` does the same straight after a run.
+
+Run from the backend directory:
+    python benchmarks/loadtest.py run --terminals 20 --duration 30 --output results.json
+    python benchmarks/loadtest.py compare baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+
+DEFAULT_MIX = {
+    "catalog_sync": 20,
+    "catalog_page": 2,
+    "product_lookup": 15,
+    "create_order": 40,
+    "submit_invoice": 15,
+    "report_sales": 3,
+    "report_daily_sales": 3,
+    "report_tax": 2,
+}
+# Share of orders with 1..8 lines: most sales are a couple of items
+ORDER_LINE_WEIGHTS = [30, 25, 15, 10, 8, 6, 4, 2]
+SECRET_KEY = "loadtest-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_process(args: list[str], env: dict, health_url: str) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", *args], cwd=BACKEND_DIR, env=env)
+    for _ in range(300):
+        if proc.poll() is not None:
+            raise RuntimeError(f"{args[0]} exited with status {proc.returncode}")
+        try:
+            httpx.get(health_url, timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"{args[0]} did not start")
+
+
+def prepare_database(database_url: str, products: int, seed: int):
+    """Create the schema and the catalog; stock is high enough never to run out."""
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+    from sqlmodel import Session, func, select
+
+    from models.database import get_engine
+    from models.models import Product, create_schema
+
+    engine = get_engine()
+    create_schema(engine)
+    with Session(engine) as db:
+        if db.exec(select(func.count()).select_from(Product)).one() >= products:
+            return
+        rng = random.Random(seed)
+        db.exec(insert(Product), params=[
+            {"name": f"Item {i}", "description": f"Load test item {i}", "price": round(rng.uniform(5, 250), 2),
+             "stock": 10 ** 9, "version": 0}
+            for i in range(products)
+        ])
+        db.commit()
+    engine.dispose()
+
+
+class Terminal:
+    """One till: its own token, connection and random sequence."""
+
+    def __init__(self, number: int, client: httpx.AsyncClient, product_ids: list[int], rng: random.Random):
+        self.number = number
+        self.client = client
+        self.product_ids = product_ids
+        self.rng = rng
+        self.catalog_version = 0
+        self.etag = None
+        self.invoices = 0
+
+    async def catalog_sync(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = await self.client.get("/api/products", params={"since": self.catalog_version}, headers=headers)
+        if response.status_code == 200:
+            self.catalog_version = response.json()["version"]
+            self.etag = response.headers.get("ETag")
+        return response
+
+    async def catalog_page(self):
+        return await self.client.get("/api/products", params={"limit": 500})
+
+    async def product_lookup(self):
+        return await self.client.get(f"/api/products/{self.rng.choice(self.product_ids)}")
+
+    async def create_order(self):
+        lines = self.rng.choices(range(1, len(ORDER_LINE_WEIGHTS) + 1), ORDER_LINE_WEIGHTS)[0]
+        items = [
+            {"product_id": product_id, "quantity": self.rng.randint(1, 3)}
+            for product_id in self.rng.sample(self.product_ids, min(lines, len(self.product_ids)))
+        ]
+        return await self.client.post("/api/orders", json={"items": items})
+
+    async def submit_invoice(self):
+        self.invoices += 1
+        return await self.client.post("/api/invoices/submit", json=self._invoice())
+
+    async def report_sales(self):
+        return await self.client.get("/api/reports/sales")
+
+    async def report_daily_sales(self):
+        return await self.client.get("/api/reports/daily-sales", params={"include_orders": "false"})
+
+    async def report_tax(self):
+        return await self.client.get("/api/reports/tax", params={"include_invoices": "false"})
+
+    def _invoice(self) -> dict:
+        today = date.today()
+        items = []
+        for seq in range(1, self.rng.randint(1, 6) + 1):
+            qty = self.rng.randint(1, 3)
+            price = round(self.rng.uniform(5, 250), 2)
+            taxed = self.rng.random() < 0.8
+            items.append({
+                "itemSeq": seq, "itemNm": f"Item {seq}", "qty": qty, "prc": price, "totAmt": round(qty * price, 2),
+                "taxTyCd": "A" if taxed else "B", "taxAmt": round(qty * price * 0.16, 2) if taxed else 0.0,
+            })
+        taxable = round(sum(i["totAmt"] for i in items if i["taxTyCd"] == "A"), 2)
+        tax = round(sum(i["taxAmt"] for i in items), 2)
+        total = round(sum(i["totAmt"] for i in items) + tax, 2)
+        return {
+            "tpin": "1000000000", "bhfId": "000", "cisInvcNo": f"LT-{self.number}-{self.invoices}-{self.rng.getrandbits(32):08x}",
+            "salesTyCd": "N", "rcptTyCd": "S", "pmtTyCd": "01", "salesSttsCd": "02",
+            "cfmDt": today.strftime("%Y%m%d") + "120000", "salesDt": today.strftime("%Y%m%d"),
+            "totItemCnt": len(items), "taxblAmtA": taxable, "taxAmtA": tax,
+            "totTaxblAmt": taxable, "totTaxAmt": tax, "totAmt": total, "itemList": items,
+        }
+
+
+async def run_terminal(terminal: Terminal, mix: dict, think: float, warmup_until: float, stop_at: float, samples):
+    actions, weights = list(mix), list(mix.values())
+    while True:
+        action = terminal.rng.choices(actions, weights)[0]
+        start = time.perf_counter()
+        if start >= stop_at:
+            return
+        try:
+            response = await getattr(terminal, action)()
+            outcome = response.status_code
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        elapsed = time.perf_counter() - start
+        if start >= warmup_until:
+            samples[action].append((elapsed, outcome))
+        if think:
+            await asyncio.sleep(terminal.rng.expovariate(1 / think))
+
+
+async def load(base_url: str, args, mix: dict) -> tuple[dict, float]:
+    from services.auth import create_token
+
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    clients = [
+        httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits,
+                          headers={"Authorization": f"Bearer {create_token(f'terminal-{n}')}"})
+        for n in range(args.terminals)
+    ]
+    try:
+        response = await clients[0].get("/api/products", params={"limit": 1000, "fields": "id"})
+        response.raise_for_status()
+        catalog = response.json()
+        product_ids = [p["id"] for p in catalog]
+        if not product_ids:
+            raise RuntimeError("the catalog is empty; seed products first")
+        samples = defaultdict(list)
+        now = time.perf_counter()
+        warmup_until, stop_at = now + args.warmup, now + args.warmup + args.duration
+        await asyncio.gather(*(
+            run_terminal(Terminal(n, client, product_ids, random.Random(args.seed * 1000 + n)),
+                         mix, args.think_ms / 1000, warmup_until, stop_at, samples)
+            for n, client in enumerate(clients)
+        ))
+        return samples, args.duration
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[pct - 1]
+
+
+def summarise(samples: dict, duration: float) -> dict:
+    endpoints = {}
+    for action, results in sorted(samples.items()):
+        times = sorted(elapsed for elapsed, _ in results)
+        statuses = defaultdict(int)
+        for _, outcome in results:
+            statuses[str(outcome)] += 1
+        errors = sum(n for outcome, n in statuses.items() if not (outcome.isdigit() and int(outcome) < 400))
+        endpoints[action] = {
+            "requests": len(times),
+            "errors": errors,
+            "throughput_rps": round(len(times) / duration, 2),
+            "p50_ms": round(percentile(times, 50) * 1000, 2),
+            "p95_ms": round(percentile(times, 95) * 1000, 2),
+            "p99_ms": round(percentile(times, 99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(times) * 1000, 2),
+            "max_ms": round(times[-1] * 1000, 2),
+            "statuses": dict(statuses),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "endpoints": endpoints,
+        "total": {
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "throughput_rps": round(total / duration, 2),
+        },
+    }
+
+
+def print_summary(result: dict):
+    print(f"{'action':<20} {'req':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for action, e in result["endpoints"].items():
+        print(f"{action:<20} {e['requests']:>7} {e['errors']:>5} {e['throughput_rps']:>8.1f} "
+              f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f}")
+    total = result["total"]
+    print(f"{'total':<20} {total['requests']:>7} {total['errors']:>5} {total['throughput_rps']:>8.1f}")
+
+
+def compare(baseline: dict, result: dict, threshold: float) -> list[str]:
+    """Regressions of result against baseline, as printable lines."""
+    regressions = []
+    print(f"{'action':<20} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for action, current in result["endpoints"].items():
+        base = baseline["endpoints"].get(action)
+        if base is None:
+            continue
+        for metric, higher_is_worse in (("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            before, after = base[metric], current[metric]
+            change = (after - before) / before if before else 0.0
+            worse = change > threshold if higher_is_worse else change < -threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"{action:<20} {metric:<15} {before:>10.2f} {after:>10.2f} {change:>+7.1%}{flag}")
+            if worse:
+                regressions.append(f"{action} {metric}: {before:.2f} -> {after:.2f} ({change:+.1%})")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{action} errors: {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def parse_mix(text: str) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        action, _, weight = part.partition("=")
+        if action not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown action {action!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[action] = float(weight)
+    return {action: weight for action, weight in mix.items() if weight > 0}
+
+
+def run(args) -> int:
+    mix = parse_mix(args.mix)
+    tax_settings = dict(part.split("=", 1) for part in args.tax.split(",") if part.strip())
+    processes = []
+    tax_stats = None
+    try:
+        base_url = args.url
+        if base_url is None:
+            # The servers started here inherit it, so the tokens minted below are valid
+            os.environ.setdefault("SECRET_KEY", SECRET_KEY)
+            database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='pos-loadtest-')}/loadtest.db"
+            prepare_database(database_url, args.products, args.seed)
+
+            tax_port = free_port()
+            processes.append(start_process(
+                ["mock_tax:app", "--host", "127.0.0.1", "--port", str(tax_port), "--log-level", "warning", "--no-access-log"],
+                {**os.environ, **{f"MOCK_TAX_{name.strip().upper()}": value for name, value in tax_settings.items()}},
+                f"http://127.0.0.1:{tax_port}/health",
+            ))
+            app_port = free_port()
+            env = {
+                **os.environ,
+                "DATABASE_URL": database_url,
+                "TAX_API_URL": f"http://127.0.0.1:{tax_port}",
+                "USE_POSTMAN_MOCK": "false",
+                # Measure the endpoints, not the limiter: one shared in-memory budget nobody reaches
+                "RATELIMIT_STORAGE_URL": os.getenv("RATELIMIT_STORAGE_URL", "memory://"),
+                "API_RATE_LIMIT": os.getenv("API_RATE_LIMIT", "1000000/second"),
+                "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+            }
+            processes.append(start_process(
+                ["app:app", "--host", "127.0.0.1", "--port", str(app_port), "--workers", str(args.workers),
+                 "--log-level", "warning", "--no-access-log"],
+                env, f"http://127.0.0.1:{app_port}/",
+            ))
+            base_url = f"http://127.0.0.1:{app_port}"
+
+        print(f"{args.terminals} terminals for {args.duration}s (+{args.warmup}s warm-up) against {base_url}")
+        samples, duration = asyncio.run(load(base_url, args, mix))
+        if args.url is None:
+            tax_stats = httpx.get(f"http://127.0.0.1:{tax_port}/stats").json()
+    finally:
+        # The app first, so its outbox worker never sees mock_tax gone
+        for proc in reversed(processes):
+            proc.terminate()
+            proc.wait()
+
+    result = {
+        "config": {
+            "terminals": args.terminals, "duration": args.duration, "warmup": args.warmup, "think_ms": args.think_ms,
+            "workers": args.workers, "products": args.products, "seed": args.seed, "mix": mix, "tax": tax_settings,
+            "url": args.url, "database": "external" if args.database_url or args.url else "sqlite (fresh)",
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **summarise(samples, duration),
+        "tax_authority": tax_stats,
+    }
+    print_summary(result)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"wrote {args.output}")
+    if args.baseline:
+        return report_regressions(json.loads(Path(args.baseline).read_text()), result, args.threshold)
+    return 0
+
+
+def report_regressions(baseline: dict, result: dict, threshold: float) -> int:
+    regressions = compare(baseline, result, threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nno regressions beyond {threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the load test")
+    run_parser.add_argument("--terminals", type=int, default=10)
+    run_parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5, help="seconds of traffic before measuring")
+    run_parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a terminal's requests")
+    run_parser.add_argument("--mix", default="", help="action weights to override, e.g. create_order=60,report_tax=0")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run_parser.add_argument("--tax", default="", help="mock_tax simulation settings, e.g. latency=longtail,latency_ms=300")
+    run_parser.add_argument("--products", type=int, default=500)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--timeout", type=float, default=30)
+    run_parser.add_argument("--url", help="target an already running app (SECRET_KEY must match)")
+    run_parser.add_argument("--database-url", help="use this database instead of a fresh SQLite file")
+    run_parser.add_argument("--output", help="write the results here as JSON")
+    run_parser.add_argument("--baseline", help="compare the results with this earlier output")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+
+    compare_parser = commands.add_parser("compare", help="compare a result file with a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("result")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if args.command == "compare":
+        baseline, result = (json.loads(Path(p).read_text()) for p in (args.baseline, args.result))
+        sys.exit(report_regressions(baseline, result, args.threshold))
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
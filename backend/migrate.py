@@ -0,0 +1,229 @@
+"""Create the database schema, or bring an existing pos.db up to it.
+
+The app does not touch the schema when it starts, so run this once for a
+new database and again after each upgrade, before starting the workers.
+create_all() only creates missing tables, so databases made by older
+versions of the backend lack the columns and indexes added since. This
+script adds them, converts the order/invoice date columns, compresses
+stored invoice responses, dates invoice logs stored without a created_at,
+and fills the daily rollups if they are new. It is safe to run more than
+once.
+
+Usage (from backend/):
+    python migrate.py
+"""
+
+import json
+import zlib
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, LargeBinary, bindparam, inspect, text
+from sqlalchemy.sql import func
+from sqlmodel import Session, SQLModel, select
+
+from models.database import get_engine, writer
+from models.models import DailySalesRollup, Invoice, Order
+from services.invoice_logs import compress_response, response_fields, response_text
+from services.rollups import rebuild_rollups
+
+# (table, column, DDL) for columns added after the table first shipped
+ADDED_COLUMNS = [
+    ("products", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("invoice_logs", "created_at", "TIMESTAMP"),
+    ("invoice_logs", "status", "VARCHAR"),
+    ("invoice_logs", "result_code", "VARCHAR"),
+    ("invoice_logs", "receipt_no", "VARCHAR"),
+    ("idempotency_keys", "request_hash", "VARCHAR"),
+]
+
+INVOICE_LOG_BATCH_SIZE = 1000
+
+# resultDt as the ZRA API and the seeded logs write it
+RESULT_DATE_FORMATS = ("%Y%m%d%H%M%S", "%Y-%m-%d %H:%M:%S", "%Y%m%d", "%Y-%m-%d")
+
+DATE_COLUMNS = [
+    ("orders", "order_date"),
+    ("invoices", "invoice_date"),
+]
+
+
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table, column, ddl in ADDED_COLUMNS:
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            print(f"✅ Added {table}.{column}")
+
+
+def convert_date_columns(conn):
+    """Store order/invoice dates as dates instead of free-form strings.
+
+    SQLite has no DATE storage class; SQLAlchemy stores dates as ISO
+    'YYYY-MM-DD' text there, which is what the old string columns held, so
+    only values carrying a time part need trimming. PostgreSQL columns are
+    converted to the DATE type.
+    """
+    inspector = inspect(conn)
+    for table, column in DATE_COLUMNS:
+        if conn.dialect.name == "postgresql":
+            col_type = next(c["type"] for c in inspector.get_columns(table) if c["name"] == column)
+            if col_type.python_type is not date:
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE DATE USING {column}::date"))
+                print(f"✅ Converted {table}.{column} to DATE")
+            continue
+
+        trimmed = conn.execute(text(
+            f"UPDATE {table} SET {column} = date({column}) "
+            f"WHERE {column} IS NOT NULL AND {column} != date({column})"
+        )).rowcount
+        if trimmed:
+            print(f"✅ Normalised {trimmed} {table}.{column} values to YYYY-MM-DD")
+        invalid = conn.execute(text(
+            f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL OR date({column}) IS NULL"
+        )).scalar()
+        if invalid:
+            raise ValueError(f"{invalid} rows in {table} have an unparseable {column}; fix them and re-run")
+
+
+def compress_invoice_logs(conn):
+    """Rewrite JSON-text invoice responses as zlib-compressed bytes.
+
+    Old rows are recognised by a NULL status, which is filled in from the
+    response along with result_code and receipt_no. PostgreSQL's text
+    column is first converted to BYTEA; SQLite stores the bytes as BLOBs
+    in the existing column.
+    """
+    if conn.dialect.name == "postgresql":
+        col_type = next(c["type"] for c in inspect(conn).get_columns("invoice_logs") if c["name"] == "response")
+        if col_type.python_type is not bytes:
+            conn.execute(text(
+                "ALTER TABLE invoice_logs ALTER COLUMN response TYPE BYTEA USING convert_to(response, 'UTF8')"
+            ))
+            print("✅ Converted invoice_logs.response to BYTEA")
+
+    update = text(
+        "UPDATE invoice_logs SET response = :response, status = :status, "
+        "result_code = :result_code, receipt_no = :receipt_no WHERE id = :id"
+    ).bindparams(bindparam("response", type_=LargeBinary))
+    converted = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, response FROM invoice_logs WHERE status IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": INVOICE_LOG_BATCH_SIZE}).all()
+        if not rows:
+            break
+        params = []
+        for row_id, stored in rows:
+            if isinstance(stored, (bytes, memoryview)):
+                stored = bytes(stored)
+                try:
+                    stored = zlib.decompress(stored).decode()
+                except zlib.error:
+                    stored = stored.decode()
+            try:
+                response = json.loads(stored)
+                fields = response_fields(response)
+            except ValueError:
+                response = {"raw": stored}
+                fields = {**response_fields(response), "status": "failed"}
+            params.append({"id": row_id, "response": compress_response(response), **fields})
+        conn.execute(update, params)
+        converted += len(rows)
+        last_id = rows[-1][0]
+    if converted:
+        print(f"✅ Compressed {converted} invoice log responses")
+
+
+def result_time(response) -> Optional[datetime]:
+    """When the authority answered, from the response's resultDt, if it has one."""
+    result_dt = response.get("resultDt") if isinstance(response, dict) else None
+    for fmt in RESULT_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(result_dt), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def date_invoice_logs(conn):
+    """Fill in created_at on invoice logs stored before the column existed.
+
+    Retention (archive_invoice_logs.py) and the date filters compare
+    created_at, so undated rows would never be archived or found. Each row
+    gets the authority's resultDt (its local time; a few hours either way
+    doesn't matter at retention's granularity) or, failing that, the time of
+    the migration. PostgreSQL then gets the NOT NULL the model declares;
+    SQLite can't add it to an existing column, and the app always sets it.
+    """
+    now = datetime.utcnow()
+    update = text("UPDATE invoice_logs SET created_at = :created_at WHERE id = :id").bindparams(
+        bindparam("created_at", type_=DateTime)
+    )
+    dated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, response FROM invoice_logs WHERE created_at IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": INVOICE_LOG_BATCH_SIZE}).all()
+        if not rows:
+            break
+        params = []
+        for row_id, stored in rows:
+            try:
+                response = json.loads(response_text(bytes(stored) if isinstance(stored, memoryview) else stored))
+            except ValueError:
+                response = None
+            params.append({"id": row_id, "created_at": result_time(response) or now})
+        conn.execute(update, params)
+        dated += len(rows)
+        last_id = rows[-1][0]
+    if dated:
+        print(f"✅ Dated {dated} invoice logs that had no created_at")
+
+    if conn.dialect.name == "postgresql":
+        column = next(c for c in inspect(conn).get_columns("invoice_logs") if c["name"] == "created_at")
+        if column["nullable"]:
+            conn.execute(text("ALTER TABLE invoice_logs ALTER COLUMN created_at SET NOT NULL"))
+            print("✅ Made invoice_logs.created_at NOT NULL")
+
+
+def create_missing_indexes(conn):
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def migrate():
+    engine = get_engine()
+    # One BEGIN IMMEDIATE transaction, so two deploys migrating at once take turns
+    with writer(engine).begin() as conn:
+        SQLModel.metadata.create_all(conn)
+        add_missing_columns(conn)
+        convert_date_columns(conn)
+        compress_invoice_logs(conn)
+        date_invoice_logs(conn)
+        create_missing_indexes(conn)
+        print("✅ Schema is up to date.")
+
+    # Rollup tables are new on databases from before they existed: fill them once
+    with Session(engine) as db:
+        has_rollups = db.exec(select(func.count()).select_from(DailySalesRollup)).one() > 0
+        has_sales = any(
+            db.exec(select(func.count()).select_from(model)).one() > 0 for model in (Order, Invoice)
+        )
+        if has_sales and not has_rollups:
+            counts = rebuild_rollups(db)
+            db.commit()
+            print(f"✅ Built rollups for {counts['days']} days.")
+
+    if engine.dialect.name == "sqlite":
+        # Refresh planner statistics for the new indexes
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    migrate()
@@ -5,7 +5,28 @@ This is a lightweight FastAPI app that simulates a tax authority endpoint used b
 
 Endpoints
 - POST /invoices/submit: Accepts any JSON payload and returns a mock acceptance response.
+- POST /trnsSales/saveSales: Same handler, on the path tax_client.py calls.
+- POST /trnsSales/saveSalesBatch: Accepts {"invoices": [...]} and returns one result per invoice.
 - GET  /health: Simple health check.
+- GET  /stats: Requests received, outcomes, in-flight/queued counts and latency percentiles.
+  DELETE /stats resets them.
+- GET  /config, PUT /config: Read or change the simulation settings below at runtime.
+
+Simulation
+The three invoice endpoints answer instantly unless configured otherwise, either
+with MOCK_TAX_<SETTING> environment variables at startup (MOCK_TAX_LATENCY=longtail)
+or with PUT /config and a JSON body of the settings to change:
+- latency: none | fixed | uniform | normal | longtail, with latency_ms (the fixed
+  value or the mean), jitter_ms (uniform half-width or normal standard deviation),
+  and for longtail a tail_rate share of requests that add a Pareto-distributed
+  delay of at least tail_ms. Delays are capped at max_latency_ms.
+- error_429_rate (answered with Retry-After: retry_after_seconds), error_5xx_rate
+  (500/502/503/504), timeout_rate (the response is held for timeout_seconds,
+  past any client timeout) and reset_rate (the TCP connection is reset without
+  a response): the share of requests that fail that way.
+- max_concurrency: requests handled at once (0 = unlimited); the rest queue, and
+  beyond queue_limit waiting requests (0 = unlimited) they get an immediate 503.
+- seed: seeds the random choices so a run can be repeated.
 
 Run
 - As module (recommended):
@@ -20,16 +41,38 @@ Notes
 
 from __future__ import annotations
 
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+import os
+import random
+import socket
+import statistics
+import struct
+import time
 import uuid
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List, Literal
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, ConfigDict
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+# Latency percentiles in /stats are computed over the most recent requests
+STATS_WINDOW = 10000
+
+
+class MockTaxAuthority(FastAPI):
+    async def __call__(self, scope, receive, send):
+        # uvicorn's send is bound to the connection's request cycle; keep its
+        # transport so a simulated reset can drop the connection
+        if scope["type"] == "http":
+            scope["mock_tax.transport"] = getattr(getattr(send, "__self__", None), "transport", None)
+        await super().__call__(scope, receive, send)
 
 
-app = FastAPI(title="Mock Tax Authority", version="1.0.0")
+app = MockTaxAuthority(title="Mock Tax Authority", version="1.0.0")
 
 # Allow all CORS (useful when testing from different origins/tools)
 app.add_middleware(
@@ -66,31 +109,251 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/invoices/submit", response_model=AuthorityResponse)
-async def submit_invoice(
-    payload: InvoicePayload,
-    fail: bool = Query(False, description="If true, simulate a rejection with HTTP 400"),
-) -> AuthorityResponse:
-    """Simulate invoice submission to a tax authority.
+class SimulationConfig(BaseModel):
+    """How the invoice endpoints misbehave; see the module docstring."""
 
-    - If `fail=true` is provided as a query parameter, return a 400 rejection.
-    - Otherwise, return a 200/201 style acceptance payload with an authority reference id.
-    """
-    if fail:
-        # Simulate a rejection path
-        raise HTTPException(status_code=400, detail="Rejected by mock authority")
+    model_config = ConfigDict(extra="forbid")
+
+    latency: Literal["none", "fixed", "uniform", "normal", "longtail"] = "none"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    tail_rate: float = 0.01
+    tail_ms: float = 1000.0
+    max_latency_ms: float = 60000.0
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    timeout_rate: float = 0.0
+    reset_rate: float = 0.0
+    timeout_seconds: float = 30.0
+    retry_after_seconds: int = 1
+    max_concurrency: int = 0
+    queue_limit: int = 0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "SimulationConfig":
+        values = {
+            name: os.environ[f"MOCK_TAX_{name.upper()}"]
+            for name in cls.model_fields
+            if f"MOCK_TAX_{name.upper()}" in os.environ
+        }
+        return cls.model_validate(values)
+
+
+class Simulator:
+    """Applies a SimulationConfig to requests and keeps the /stats counters."""
+
+    def __init__(self, config: SimulationConfig):
+        self.configure(config)
+        self.reset_stats()
+
+    def configure(self, config: SimulationConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        # Requests already queued on the old condition keep waiting on it
+        self._slots = asyncio.Condition() if config.max_concurrency else None
+
+    def reset_stats(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.received = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.max_in_flight = 0
+        self.outcomes: Counter[str] = Counter()
+        self.paths: Counter[str] = Counter()
+        self.durations: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.queue_waits: deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def delay(self) -> float:
+        """Seconds to wait before answering, drawn from the latency distribution."""
+        c = self.config
+        if c.latency == "fixed":
+            ms = c.latency_ms
+        elif c.latency == "uniform":
+            ms = self.rng.uniform(c.latency_ms - c.jitter_ms, c.latency_ms + c.jitter_ms)
+        elif c.latency == "normal":
+            ms = self.rng.gauss(c.latency_ms, c.jitter_ms)
+        elif c.latency == "longtail":
+            ms = self.rng.gauss(c.latency_ms, c.jitter_ms)
+            if self.rng.random() < c.tail_rate:
+                ms += c.tail_ms * self.rng.paretovariate(1.5)
+        else:
+            ms = 0.0
+        return min(max(ms, 0.0), c.max_latency_ms) / 1000
+
+    def fault(self) -> Optional[str]:
+        """reset, timeout, 429, 5xx or None, with the configured probabilities."""
+        c = self.config
+        roll = self.rng.random()
+        for name, rate in (("reset", c.reset_rate), ("timeout", c.timeout_rate),
+                           ("429", c.error_429_rate), ("5xx", c.error_5xx_rate)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of max_concurrency slots; yields False if the queue is full."""
+        slots = self._slots
+        if slots is None:
+            self.in_flight += 1
+            try:
+                yield True
+            finally:
+                self.in_flight -= 1
+            return
+        if self.config.queue_limit and self.queued >= self.config.queue_limit and self.in_flight >= self.config.max_concurrency:
+            yield False
+            return
+        start = time.perf_counter()
+        self.queued += 1
+        try:
+            async with slots:
+                await slots.wait_for(lambda: self.in_flight < self.config.max_concurrency)
+                self.in_flight += 1
+        finally:
+            self.queued -= 1
+        self.queue_waits.append(time.perf_counter() - start)
+        try:
+            yield True
+        finally:
+            async with slots:
+                self.in_flight -= 1
+                slots.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "since": self.started_at.isoformat(),
+            "requests": self.received,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "outcomes": dict(self.outcomes),
+            "paths": dict(self.paths),
+            "latency_ms": _summary(self.durations),
+            "queue_wait_ms": _summary(self.queue_waits),
+            "config": self.config.model_dump(),
+        }
+
+
+def _summary(samples) -> Dict[str, Any]:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values) * 1000, 2),
+        "p50": round(cuts[49] * 1000, 2),
+        "p95": round(cuts[94] * 1000, 2),
+        "p99": round(cuts[98] * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+simulator = Simulator(SimulationConfig.from_env())
+
+
+def reset_connection(request: Request):
+    """Drop the client's TCP connection with a RST instead of answering."""
+    transport = request.scope.get("mock_tax.transport")
+    if transport is None:
+        raise ConnectionResetError("Simulated connection reset")
+    sock = transport.get_extra_info("socket")
+    if sock is not None:
+        # SO_LINGER with a zero timeout makes close() send RST rather than FIN
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    transport.abort()
 
-    data = payload.model_dump()
 
+async def simulate(request: Request, handler):
+    """Run handler() under the configured concurrency cap, latency and faults."""
+    sim = simulator
+    sim.received += 1
+    sim.paths[request.url.path] += 1
+    start = time.perf_counter()
+    outcome = "200"
+    try:
+        async with sim.slot() as admitted:
+            if not admitted:
+                outcome = "503"
+                return JSONResponse(status_code=503, content={"detail": "Mock authority overloaded"})
+            sim.max_in_flight = max(sim.max_in_flight, sim.in_flight)
+            await asyncio.sleep(sim.delay())
+            fault = sim.fault()
+            if fault == "reset":
+                outcome = "reset"
+                reset_connection(request)
+                return JSONResponse(status_code=500, content={})
+            if fault == "timeout":
+                outcome = "timeout"
+                await asyncio.sleep(sim.config.timeout_seconds)
+            elif fault == "429":
+                outcome = "429"
+                return JSONResponse(
+                    status_code=429, content={"detail": "Too many requests"},
+                    headers={"Retry-After": str(sim.config.retry_after_seconds)},
+                )
+            elif fault == "5xx":
+                code = sim.rng.choice([500, 502, 503, 504])
+                outcome = str(code)
+                return JSONResponse(status_code=code, content={"detail": "Simulated server error"})
+            try:
+                return handler()
+            except HTTPException as e:
+                outcome = str(e.status_code)
+                raise
+    finally:
+        sim.outcomes[outcome] += 1
+        sim.durations.append(time.perf_counter() - start)
+
+
+@app.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    return simulator.stats()
+
+
+@app.delete("/stats")
+async def reset_stats() -> Dict[str, Any]:
+    simulator.reset_stats()
+    return simulator.stats()
+
+
+@app.get("/config", response_model=SimulationConfig)
+async def get_config() -> SimulationConfig:
+    return simulator.config
+
+
+@app.put("/config", response_model=SimulationConfig)
+async def update_config(update: Dict[str, Any]) -> SimulationConfig:
+    """Change the given settings; the others keep their current values."""
+    try:
+        config = SimulationConfig.model_validate({**simulator.config.model_dump(), **update})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    simulator.configure(config)
+    return config
+
+
+class BatchPayload(BaseModel):
+    invoices: List[InvoicePayload]
+
+
+class BatchResponse(BaseModel):
+    results: List[AuthorityResponse]
+
+
+def accept_invoice(data: Dict[str, Any]) -> AuthorityResponse:
     # Try to infer commonly used fields from arbitrary payloads
     inv_no: Optional[str] = None
-    for key in ["cis_invc_no", "invoice_number", "invoiceNo", "invoice_no", "id", "number"]:
+    for key in ["cis_invc_no", "invoice_number", "invoiceNo", "invoice_no", "invcNo", "id", "number"]:
         if key in data and data[key] is not None:
             inv_no = str(data[key])
             break
 
     amount: Optional[float] = None
-    for key in ["total", "total_amount", "grand_total", "amount", "totalAmount"]:
+    for key in ["total", "total_amount", "grand_total", "amount", "totalAmount", "totalAmt"]:
         val = data.get(key)
         if isinstance(val, (int, float)):
             amount = float(val)
@@ -104,6 +367,43 @@ async def submit_invoice(
     )
 
 
+@app.post("/invoices/submit", response_model=AuthorityResponse)
+@app.post("/trnsSales/saveSales", response_model=AuthorityResponse)
+async def submit_invoice(
+    request: Request,
+    payload: InvoicePayload,
+    fail: bool = Query(False, description="If true, simulate a rejection with HTTP 400"),
+) -> AuthorityResponse:
+    """Simulate invoice submission to a tax authority.
+
+    - If `fail=true` is provided as a query parameter, return a 400 rejection.
+    - Otherwise, return a 200/201 style acceptance payload with an authority reference id,
+      after the configured latency and unless a simulated fault happens instead.
+    """
+    def handle():
+        if fail:
+            # Simulate a rejection path
+            raise HTTPException(status_code=400, detail="Rejected by mock authority")
+        return accept_invoice(payload.model_dump())
+
+    return await simulate(request, handle)
+
+
+@app.post("/trnsSales/saveSalesBatch", response_model=BatchResponse)
+async def submit_invoice_batch(
+    request: Request,
+    payload: BatchPayload,
+    fail: bool = Query(False, description="If true, simulate a rejection of the whole batch with HTTP 400"),
+) -> BatchResponse:
+    """Simulate a batch submission; results are returned in request order."""
+    def handle():
+        if fail:
+            raise HTTPException(status_code=400, detail="Rejected by mock authority")
+        return BatchResponse(results=[accept_invoice(inv.model_dump()) for inv in payload.invoices])
+
+    return await simulate(request, handle)
+
+
 if __name__ == "__main__":
     # Allow running directly with `python backend/mock_tax.py`
     import uvicorn
@@ -0,0 +1,212 @@
+from dotenv import load_dotenv
+import functools
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+load_dotenv()
+
+DEFAULT_DATABASE_URL = f"sqlite:///{Path(__file__).resolve().parent.parent / 'pos.db'}"
+
+
+def database_url() -> str:
+    # DB_URL is what models.py used to read; DATABASE_URL is what everything else reads
+    return os.getenv("DATABASE_URL") or os.getenv("DB_URL") or DEFAULT_DATABASE_URL
+
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+T = TypeVar("T")
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def sqlite_pragmas() -> dict:
+    """PRAGMAs applied to every new SQLite connection.
+
+    WAL lets readers run alongside the single writer instead of blocking on
+    it, synchronous=NORMAL is durable in WAL mode (a power cut can lose the
+    last commits, never corrupt the file), busy_timeout makes a second writer
+    wait for the lock instead of failing with "database is locked", and
+    cache_size (negative = KiB) / mmap_size keep hot pages in memory.
+    """
+    # busy_timeout goes first so switching the journal mode waits for the lock too
+    return {
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    }
+
+
+def make_engine(url: Optional[str] = None, echo: Optional[bool] = None, pragmas: Optional[dict] = None) -> Engine:
+    """Create an engine configured from the environment.
+
+    SQL is only logged when DB_ECHO=true. pragmas overrides sqlite_pragmas(). Pool sizing comes from
+    DB_POOL_SIZE (10), DB_MAX_OVERFLOW (20), DB_POOL_TIMEOUT seconds (30)
+    and, for server databases, DB_POOL_RECYCLE seconds (1800).
+    """
+    url = url or database_url()
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+    in_memory = is_sqlite and make_url(url).database in (None, "", ":memory:")
+
+    kwargs = _engine_kwargs(is_sqlite, in_memory, echo)
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    engine = create_engine(url, **kwargs)
+    if is_sqlite:
+        _configure_sqlite(engine, {} if in_memory else pragmas or sqlite_pragmas())
+    return engine
+
+
+def make_async_engine(url: Optional[str] = None, echo: Optional[bool] = None) -> Optional[AsyncEngine]:
+    """Create an async engine (aiosqlite / asyncpg) for the same database.
+
+    Returns None when DB_ASYNC=false, when the database has no async driver
+    listed in ASYNC_DRIVERS or when that driver isn't installed; callers then
+    fall back to the sync engine in a worker thread (see run_db).
+    """
+    if not _env_flag("DB_ASYNC", "true"):
+        return None
+    url = make_url(url or database_url())
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return None
+    is_sqlite = backend == "sqlite"
+    in_memory = is_sqlite and url.database in (None, "", ":memory:")
+    if in_memory:
+        # Each in-memory connection is its own database; only the sync engine's pool can share one
+        return None
+
+    kwargs = _engine_kwargs(is_sqlite, in_memory, echo)
+    kwargs["poolclass"] = AsyncAdaptedQueuePool
+    try:
+        engine = create_async_engine(url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"), **kwargs)
+    except ImportError:
+        logging.warning(f"{ASYNC_DRIVERS[backend]} is not installed; async endpoints will use the sync engine")
+        return None
+    if is_sqlite:
+        pragmas = sqlite_pragmas()
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _on_connect(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    return engine
+
+
+def _engine_kwargs(is_sqlite: bool, in_memory: bool, echo: Optional[bool]) -> dict:
+    kwargs = {"echo": _env_flag("DB_ECHO") if echo is None else echo}
+    if not in_memory:
+        kwargs.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+    if not is_sqlite:
+        kwargs.update(pool_pre_ping=True, pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")))
+    return kwargs
+
+
+def _configure_sqlite(engine: Engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _):
+        # pysqlite's implicit transactions make RELEASE SAVEPOINT commit everything;
+        # let SQLAlchemy emit BEGIN itself so nested transactions behave.
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', '')}".strip())
+
+
+def writer(engine: Engine) -> Engine:
+    """The engine for sessions that will write.
+
+    On SQLite a plain BEGIN starts a read transaction that has to be upgraded
+    at its first write; under WAL that upgrade fails with "database is
+    locked" straight away (busy_timeout can't help) if another connection
+    committed in between. BEGIN IMMEDIATE takes the write lock up front, so
+    concurrent writers queue on busy_timeout instead. Other databases ignore
+    the option.
+    """
+    return engine.execution_options(sqlite_begin="IMMEDIATE")
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """The application's engine, created on first use.
+
+    Nothing connects at import time: the app's lifespan creates the engines
+    at startup, scripts on first use. Schema changes are a separate step
+    (models.models.create_schema, run by migrate.py).
+    """
+    return make_engine()
+
+
+@functools.lru_cache(maxsize=None)
+def get_write_engine() -> Engine:
+    """get_engine() with writer()'s BEGIN IMMEDIATE, sharing its pool."""
+    return writer(get_engine())
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_engine() -> Optional[AsyncEngine]:
+    """The async engine for get_engine()'s database, or None (see make_async_engine)."""
+    return make_async_engine()
+
+
+async def dispose_engines():
+    """Close the engines' pools and forget them; the next get_*() makes new ones."""
+    if get_async_engine.cache_info().currsize and get_async_engine() is not None:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    for cached in (get_async_engine, get_write_engine, get_engine):
+        cached.cache_clear()
+
+
+async def get_async_db():
+    """FastAPI dependency: an AsyncSession, or None when there is no async engine."""
+    async_engine = get_async_engine()
+    if async_engine is None:
+        yield None
+        return
+    async with AsyncSession(async_engine) as db:
+        yield db
+
+
+async def run_db(db: Optional[AsyncSession], fn: Callable[..., T], *args) -> T:
+    """Run fn(session, *args) without blocking the event loop.
+
+    With an AsyncSession, fn gets its sync facade and every query it makes is
+    awaited on the async driver. Without one, fn runs on a sync Session in a
+    worker thread. Either way fn is plain sync code, so it can share helpers
+    (like the product cache) with the sync endpoints.
+    """
+    if db is not None:
+        return await db.run_sync(fn, *args)
+
+    def call():
+        with Session(get_engine()) as sync_db:
+            return fn(sync_db, *args)
+    return await run_in_threadpool(call)
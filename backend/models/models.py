@@ -1,13 +1,10 @@
-from dotenv import load_dotenv
-import os
-from sqlmodel import SQLModel, Field, Session, create_engine
+from sqlmodel import SQLModel, Field, Session
 from typing import Optional
+from datetime import date, datetime
+from sqlalchemy import Column, Index, LargeBinary, UniqueConstraint
 from pydantic import validator
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DB_URL", "sqlite:///C:/projects/pos/backend/pos.db")
-engine = create_engine(DATABASE_URL, echo=True)  
+from models.database import writer
 
 
 SessionLocal = Session
@@ -19,6 +16,7 @@ class Product(SQLModel, table=True):
     description: Optional[str] = None
     price: float
     stock: int
+    version: int = Field(default=0, index=True)  # catalog version of the last change
 
     @validator('price')
     def validate_price(cls, v):
@@ -32,27 +30,114 @@ class Product(SQLModel, table=True):
             raise ValueError('Stock cannot be negative')
         return v
 
+class ProductTombstone(SQLModel, table=True):
+    __tablename__ = "product_tombstones"
+    product_id: int = Field(primary_key=True)
+    version: int = Field(index=True)
+
+class CatalogState(SQLModel, table=True):
+    __tablename__ = "catalog_state"
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
+
 class Order(SQLModel, table=True):
     __tablename__ = "orders"
+    __table_args__ = (Index("ix_orders_product_id_order_date", "product_id", "order_date"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     product_id: int = Field(foreign_key="products.id")
     quantity: int
     total_price: float
-    order_date: str
+    order_date: date = Field(index=True)
+
+class OrderItem(SQLModel, table=True):
+    __tablename__ = "order_items"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: int = Field(foreign_key="orders.id", index=True)
+    product_id: int = Field(foreign_key="products.id")
+    quantity: int
+    unit_price: float
+    line_total: float
 
 class Invoice(SQLModel, table=True):
     __tablename__ = "invoices"
     id: Optional[int] = Field(default=None, primary_key=True)
-    order_id: int = Field(foreign_key="orders.id")
+    order_id: int = Field(foreign_key="orders.id", index=True)
     cis_invc_no: str
     total_amount: float
     tax_amount: float
-    invoice_date: str
+    invoice_date: date = Field(index=True)
+
+class DailySalesRollup(SQLModel, table=True):
+    __tablename__ = "daily_sales_rollup"
+    sales_date: date = Field(primary_key=True)
+    order_count: int = 0
+    items_sold: int = 0
+    total_sales: float = 0.0
+    invoice_count: int = 0
+    invoice_total: float = 0.0
+    tax_total: float = 0.0
+
+class DailyProductSalesRollup(SQLModel, table=True):
+    __tablename__ = "daily_product_sales_rollup"
+    sales_date: date = Field(primary_key=True)
+    product_id: int = Field(primary_key=True)
+    quantity: int = 0
+    total_sales: float = 0.0
 
 class InvoiceLog(SQLModel, table=True):
     __tablename__ = "invoice_logs"
+    __table_args__ = (Index("ix_invoice_logs_status_created_at", "status", "created_at"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     cis_invc_no: str = Field(index=True)
+    response: bytes = Field(sa_column=Column(LargeBinary, nullable=False))  # zlib-compressed JSON
+    status: Optional[str] = None  # "success" or "failed"
+    result_code: Optional[str] = Field(default=None, index=True)
+    receipt_no: Optional[str] = Field(default=None, index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    scope: str
+    key: str
+    status_code: int
     response: str
+    request_hash: Optional[str] = None  # sha256 of the request body the response belongs to
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class RevokedToken(SQLModel, table=True):
+    __tablename__ = "revoked_tokens"
+    jti: str = Field(primary_key=True)  # the whole token for tokens without a jti
+    expires_at: datetime = Field(index=True)  # the token's exp; the row is useless after it
+
+class InvoiceOutbox(SQLModel, table=True):
+    __tablename__ = "invoice_outbox"
+    __table_args__ = (Index("ix_invoice_outbox_status_next_attempt", "status", "next_attempt_at"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cis_invc_no: str = Field(index=True)
+    payload: str
+    status: str = "pending"  # pending, in_progress, sent, failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    invoice_log_id: Optional[int] = Field(default=None, foreign_key="invoice_logs.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class RateLimitCounter(SQLModel, table=True):
+    __tablename__ = "rate_limit_counters"
+    key: str = Field(primary_key=True)
+    count: int = 0
+    expires_at: float = Field(index=True)  # epoch seconds at which the window resets
+
+
+def create_schema(engine):
+    """Create the tables and indexes that don't exist yet.
 
-SQLModel.metadata.create_all(engine)
+    An explicit step (migrate.py, seed.py, or the app's startup with
+    DB_CREATE_SCHEMA=true), never an import side effect. Runs under BEGIN
+    IMMEDIATE so processes doing it at once on SQLite take turns instead of
+    racing on the DDL.
+    """
+    SQLModel.metadata.create_all(writer(engine))
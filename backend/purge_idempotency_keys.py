@@ -0,0 +1,23 @@
+"""Delete stored Idempotency-Key responses older than their TTL.
+
+Keys older than IDEMPOTENCY_KEY_TTL_HOURS (default 168, a week) are no
+longer replayed, so their rows only take up space. Run it daily from cron.
+
+Usage (from backend/):
+    python purge_idempotency_keys.py
+"""
+
+from sqlmodel import Session
+
+from models.database import get_write_engine
+from services.idempotency import idempotency_store
+
+
+def main():
+    with Session(get_write_engine()) as db:
+        purged = idempotency_store.purge(db)
+    print(f"✅ Purged {purged} idempotency keys older than {idempotency_store.ttl}.")
+
+
+if __name__ == "__main__":
+    main()
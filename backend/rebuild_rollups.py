@@ -0,0 +1,32 @@
+"""Rebuild the daily sales rollups from the orders and invoices tables.
+
+Use it to backfill the rollups on an existing database, or to repair them
+after editing orders or invoices by hand.
+
+Usage (from backend/):
+    python rebuild_rollups.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import argparse
+from datetime import date
+
+from sqlmodel import Session
+
+from models.database import get_write_engine
+from services.rollups import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollups.")
+    parser.add_argument("--start", type=date.fromisoformat, help="first date to rebuild (default: all)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last date to rebuild (default: all)")
+    args = parser.parse_args()
+
+    with Session(get_write_engine()) as db:
+        counts = rebuild_rollups(db, args.start, args.end)
+        db.commit()
+    print(f"✅ Rebuilt rollups: {counts['days']} days, {counts['product_days']} product-days.")
+
+
+if __name__ == "__main__":
+    main()
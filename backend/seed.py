@@ -1,18 +1,41 @@
-from sqlmodel import Session, create_engine, select
-from models.models import Product, Order, Invoice, InvoiceLog
+"""Fill the database with sample data.
+
+With no arguments it adds the Mpepo Kitchen demo menu and a week of sales.
+The bulk command generates a production-sized history instead: products
+with skewed popularity and a mix of tax types, and every day's orders,
+order items, invoices and invoice logs, written with Core bulk inserts in
+chunked transactions. The same --seed always produces the same rows.
+
+Usage (from backend/):
+    python seed.py
+    python seed.py bulk [--products 500] [--days 365] [--orders-per-day 1000] [--seed 1]
+"""
+
+import argparse
+import bisect
+import itertools
+import random
+import time as clock
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlmodel import Session, select
+from sqlalchemy import insert
 from sqlalchemy.sql import func
-from dotenv import load_dotenv
-import os
-import json
-from datetime import date, timedelta
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///C:/projects/pos/backend/pos.db")  # Fixed variable name
-engine = create_engine(DATABASE_URL, echo=True)
+from models.models import Product, Order, OrderItem, Invoice, InvoiceLog, create_schema
+from services.catalog import bump_catalog_version
+from services.rollups import add_totals, rebuild_rollups
+from services.invoice_logs import new_invoice_log
+from models.database import get_engine, get_write_engine, make_engine, sqlite_pragmas, writer
+
 
 def seed_data():
     """Insert sample data into products, orders, invoices, and invoice_logs tables."""
-    with Session(engine) as db:
+    create_schema(get_engine())
+    with Session(get_write_engine()) as db:
         try:
             # Seed products - Mpepo Kitchen menu
             if db.exec(select(func.count()).select_from(Product)).one() == 0:
@@ -26,6 +49,10 @@ def seed_data():
                     Product(name="Coca Cola", description="330ml bottle", price=8.0, stock=100),
                     Product(name="Fresh Juice", description="Freshly squeezed orange juice", price=15.0, stock=50),
                 ]
+                # One catalog version for the whole menu, so terminals pick it up
+                version = bump_catalog_version(db)
+                for product in products:
+                    product.version = version
                 db.add_all(products)
                 db.commit()
                 print("✅ Seeded 8 products.")
@@ -39,7 +66,7 @@ def seed_data():
                 
                 # Generate orders for past 7 days
                 for i in range(7):
-                    order_date = str(today - timedelta(days=i))
+                    order_date = today - timedelta(days=i)
                     # Create 3-5 orders per day
                     orders.extend([
                         Order(product_id=1, quantity=2, total_price=90.0, order_date=order_date),
@@ -83,9 +110,9 @@ def seed_data():
                 logs = []
                 
                 for invoice in invoices:
-                    log = InvoiceLog(
-                        cis_invc_no=invoice.cis_invc_no,
-                        response=json.dumps({
+                    log = new_invoice_log(
+                        invoice.cis_invc_no,
+                        {
                             "resultCd": "000",
                             "resultMsg": "Success",
                             "resultDt": str(date.today()),
@@ -95,7 +122,7 @@ def seed_data():
                                 "rcptSign": "MOCK_SIGNATURE",
                                 "sdcDateTime": str(date.today())
                             }
-                        })
+                        }
                     )
                     logs.append(log)
                 
@@ -105,11 +132,303 @@ def seed_data():
             else:
                 print("⚠️  Invoice logs already exist. Skipping invoice log seeding.")
 
+            # Seeded rows bypass the order endpoint, and invoices only reach the rollups on a rebuild
+            counts = rebuild_rollups(db)
+            db.commit()
+            print(f"✅ Rebuilt rollups for {counts['days']} days.")
+
             print("\n🎉 Database seeding completed successfully!")
 
         except Exception as e:
             print(f"❌ Error seeding data: {str(e)}")
             db.rollback()
 
+
+# ZRA tax type codes: (code, rate, share of products). A is standard-rated
+# VAT, B minimum taxable value, C zero-rated, D exempt, E disbursements.
+TAX_TYPES = [("A", 0.16, 0.72), ("B", 0.16, 0.04), ("C", 0.0, 0.08), ("D", 0.0, 0.14), ("E", 0.0, 0.02)]
+
+DISHES = [
+    ("Nshima with Chicken", 45), ("Nshima with Beef Stew", 50), ("Nshima with Kapenta", 35),
+    ("T-Bone Steak", 85), ("Fish and Chips", 55), ("Grilled Bream", 70), ("Vegetable Curry", 35),
+    ("Burger", 40), ("Pizza", 65), ("Chicken Wings", 45), ("Beef Samosas", 20), ("Village Chicken", 75),
+    ("Rape and Groundnuts", 25), ("Chips", 18), ("Coca Cola", 8), ("Fresh Juice", 15), ("Mosi Lager", 20),
+    ("Maheu", 10), ("Bottled Water", 6), ("Tea", 8), ("Coffee", 15), ("Chocolate Cake", 25),
+]
+VARIANTS = ["Regular", "Large", "Family", "Half", "Spicy", "Special", "Kids", "Combo"]
+
+# Items per order and units per item, as (value, weight)
+ITEMS_PER_ORDER = [(1, 40), (2, 30), (3, 15), (4, 9), (5, 4), (6, 2)]
+UNITS_PER_ITEM = [(1, 70), (2, 20), (3, 7), (4, 2), (6, 1)]
+# Monday to Sunday, relative to the --orders-per-day average
+WEEKDAY_LOAD = [0.8, 0.8, 0.9, 0.95, 1.2, 1.35, 1.0]
+# Invoices are submitted between 09:00 and 22:00
+OPENING_SECONDS = 9 * 3600
+TRADING_SECONDS = 13 * 3600
+
+
+def _cumulative(weights) -> list[float]:
+    return list(itertools.accumulate(weights))
+
+
+class BulkGenerator:
+    """Writes a reproducible sales history for load and report testing.
+
+    Orders, items and invoices get explicit ids following the existing
+    rows, so the tables can be inserted independently without reading ids
+    back. Each chunk (chunk_size orders with their items, invoices, logs
+    and rollup totals) is one transaction; an interrupted run leaves whole
+    chunks behind and the rollups in step with them.
+
+    Rows are built as tuples. On SQLite they go straight to the driver's
+    executemany, with dates in the ISO text SQLAlchemy stores them as,
+    which is about 2.5x faster than a Core insert binding a dict per row;
+    other databases get the Core insert.
+    """
+
+    ORDER_COLUMNS = ("id", "product_id", "quantity", "total_price", "order_date")
+    ITEM_COLUMNS = ("id", "order_id", "product_id", "quantity", "unit_price", "line_total")
+    INVOICE_COLUMNS = ("id", "order_id", "cis_invc_no", "total_amount", "tax_amount", "invoice_date")
+    LOG_COLUMNS = ("cis_invc_no", "response", "status", "result_code", "receipt_no", "created_at")
+
+    def __init__(
+        self,
+        engine,
+        products: int = 500,
+        days: int = 365,
+        orders_per_day: int = 1000,
+        seed: int = 1,
+        end: Optional[date] = None,
+        invoice_rate: float = 0.9,
+        log_rate: float = 1.0,
+        chunk_size: int = 50000,
+    ):
+        self.engine = engine
+        self.products = products
+        self.days = days
+        self.orders_per_day = orders_per_day
+        self.end = end or date.today()
+        self.invoice_rate = invoice_rate
+        self.log_rate = log_rate
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.raw = engine.dialect.name == "sqlite"
+        self.counts = {"products": 0, "orders": 0, "order_items": 0, "invoices": 0, "invoice_logs": 0}
+
+    def run(self) -> dict:
+        with Session(self.engine) as db:
+            next_ids = {
+                model: (db.exec(select(func.max(model.id))).one() or 0) + 1
+                for model in (Product, Order, OrderItem, Invoice)
+            }
+        self.order_id = next_ids[Order]
+        self.item_id = next_ids[OrderItem]
+        self.invoice_id = next_ids[Invoice]
+        self._insert_products(next_ids[Product])
+        self._reset_chunk()
+        for day in range(self.days - 1, -1, -1):
+            self._generate_day(self.end - timedelta(days=day))
+        self._flush()
+        if self.engine.dialect.name == "postgresql":
+            self._advance_sequences()
+        return self.counts
+
+    def _advance_sequences(self):
+        # The ids were given explicitly, so the serial sequences never moved
+        with Session(self.engine) as db:
+            for model in (Product, Order, OrderItem, Invoice):
+                table = model.__tablename__
+                db.connection().exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                )
+            db.commit()
+
+    def _insert_products(self, first_id: int):
+        rng = self.rng
+        rows = []
+        self.catalog = []  # (id, price, tax rate)
+        tax_cum = _cumulative(share for _, _, share in TAX_TYPES)
+        for n in range(self.products):
+            dish, base_price = DISHES[n % len(DISHES)]
+            variant = VARIANTS[(n // len(DISHES)) % len(VARIANTS)]
+            batch = n // (len(DISHES) * len(VARIANTS))
+            name = f"{dish} ({variant})" + (f" #{batch + 1}" if batch else "")
+            price = round(base_price * rng.uniform(0.7, 1.6) * 2) / 2
+            code, rate, _ = TAX_TYPES[bisect.bisect(tax_cum, rng.random() * tax_cum[-1])]
+            rows.append({
+                "id": first_id + n, "name": name, "description": f"{dish}, {variant.lower()}, tax type {code}",
+                "price": price, "stock": 1_000_000,
+            })
+            self.catalog.append((first_id + n, price, rate))
+        # Popularity follows a Zipf-like curve over a shuffled catalog
+        rng.shuffle(self.catalog)
+        self.product_cum = _cumulative(1 / (rank + 1) ** 0.9 for rank in range(len(self.catalog)))
+        with Session(writer(self.engine)) as db:
+            # One catalog version for the run, so terminals' ETags and ?since=
+            # see the new products
+            version = bump_catalog_version(db)
+            for row in rows:
+                row["version"] = version
+            db.connection().execute(insert(Product.__table__), rows)
+            db.commit()
+        self.counts["products"] = len(rows)
+
+    def _reset_chunk(self):
+        self.orders, self.items, self.invoices, self.logs = [], [], [], []
+        self.daily = defaultdict(lambda: {
+            "order_count": 0, "items_sold": 0, "total_sales": 0.0,
+            "invoice_count": 0, "invoice_total": 0.0, "tax_total": 0.0,
+        })
+        self.per_product = defaultdict(lambda: {"quantity": 0, "total_sales": 0.0})
+
+    def _generate_day(self, day: date):
+        rng = self.rng
+        choices = rng.choices
+        catalog, product_cum = self.catalog, self.product_cum
+        item_counts, item_cum = zip(*ITEMS_PER_ORDER)
+        item_cum = _cumulative(item_cum)
+        units, unit_cum = zip(*UNITS_PER_ITEM)
+        unit_cum = _cumulative(unit_cum)
+        day_value = day.isoformat() if self.raw else day
+        day_stamp = day.strftime("%Y%m%d")
+        count = round(self.orders_per_day * WEEKDAY_LOAD[day.weekday()] * rng.uniform(0.85, 1.15))
+
+        for _ in range(count):
+            if len(self.orders) >= self.chunk_size:
+                self._flush()
+            daily, per_product = self.daily[day], self.per_product
+            order_id = self.order_id
+            self.order_id += 1
+            lines = choices(catalog, cum_weights=product_cum, k=choices(item_counts, cum_weights=item_cum)[0])
+            quantities = choices(units, cum_weights=unit_cum, k=len(lines))
+            order_total = 0.0
+            tax = 0.0
+            for (product_id, price, rate), quantity in zip(lines, quantities):
+                line_total = round(price * quantity, 2)
+                self.items.append((self.item_id, order_id, product_id, quantity, price, line_total))
+                self.item_id += 1
+                order_total += line_total
+                tax += line_total * rate
+                totals = per_product[(day, product_id)]
+                totals["quantity"] += quantity
+                totals["total_sales"] += line_total
+            order_total = round(order_total, 2)
+            items_sold = sum(quantities)
+            self.orders.append((order_id, lines[0][0], items_sold, order_total, day_value))
+            daily["order_count"] += 1
+            daily["items_sold"] += items_sold
+            daily["total_sales"] += order_total
+
+            if rng.random() < self.invoice_rate:
+                tax = round(tax, 2)
+                total = round(order_total + tax, 2)
+                cis_invc_no = f"SEED-{order_id:010d}"
+                self.invoices.append((self.invoice_id, order_id, cis_invc_no, total, tax, day_value))
+                self.invoice_id += 1
+                daily["invoice_count"] += 1
+                daily["invoice_total"] += total
+                daily["tax_total"] += tax
+                if rng.random() < self.log_rate:
+                    submitted = OPENING_SECONDS + rng.randrange(TRADING_SECONDS)
+                    self.logs.append(self._log(order_id, cis_invc_no, day, day_stamp, submitted))
+
+    def _log(self, order_id: int, cis_invc_no: str, day: date, day_stamp: str, second_of_day: int) -> tuple:
+        hours, rest = divmod(second_of_day, 3600)
+        minutes, seconds = divmod(rest, 60)
+        stamp = f"{day_stamp}{hours:02d}{minutes:02d}{seconds:02d}"
+        # The JSON compress_response would write, formatted directly because
+        # json.dumps and strftime were most of the cost of a row; the promoted
+        # columns are what response_fields() gives for a success response
+        response = (
+            f'{{"resultCd":"000","resultMsg":"It is succeeded","resultDt":"{stamp}","data":{{"rcptNo":{order_id},'
+            f'"intrlData":"SEED{order_id:016X}","rcptSign":"{self.rng.getrandbits(64):016X}","sdcDateTime":"{stamp}"}}}}'
+        )
+        if self.raw:
+            created_at = f"{day.isoformat()} {hours:02d}:{minutes:02d}:{seconds:02d}.000000"
+        else:
+            created_at = datetime.combine(day, time(hours, minutes, seconds))
+        return (cis_invc_no, zlib.compress(response.encode(), 6), "success", "000", str(order_id), created_at)
+
+    def _insert(self, conn, model, columns: tuple, rows: list[tuple]):
+        if not rows:
+            return
+        table = model.__table__
+        if self.raw:
+            placeholders = ", ".join("?" * len(columns))
+            conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        else:
+            conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+    def _flush(self):
+        if not self.orders:
+            return
+        with Session(writer(self.engine)) as db:
+            conn = db.connection()
+            # Parents first; server databases check foreign keys row by row
+            self._insert(conn, Order, self.ORDER_COLUMNS, self.orders)
+            self._insert(conn, OrderItem, self.ITEM_COLUMNS, self.items)
+            self._insert(conn, Invoice, self.INVOICE_COLUMNS, self.invoices)
+            self._insert(conn, InvoiceLog, self.LOG_COLUMNS, self.logs)
+            add_totals(db, self.daily, self.per_product)
+            db.commit()
+        self.counts["orders"] += len(self.orders)
+        self.counts["order_items"] += len(self.items)
+        self.counts["invoices"] += len(self.invoices)
+        self.counts["invoice_logs"] += len(self.logs)
+        print(
+            f"  … {self.counts['orders']:,} orders, {self.counts['order_items']:,} items, "
+            f"{self.counts['invoices']:,} invoices up to {self.orders[-1][4]}",
+            flush=True,
+        )
+        self._reset_chunk()
+
+
+def seed_bulk(args):
+    # Losing the last chunks to a power cut is fine for generated data
+    bulk_engine = make_engine(echo=False, pragmas={**sqlite_pragmas(), "synchronous": "OFF"})
+    create_schema(bulk_engine)
+    generator = BulkGenerator(
+        bulk_engine,
+        products=args.products,
+        days=args.days,
+        orders_per_day=args.orders_per_day,
+        seed=args.seed,
+        end=args.end,
+        invoice_rate=args.invoice_rate,
+        log_rate=args.log_rate,
+        chunk_size=args.chunk_size,
+    )
+    start = clock.perf_counter()
+    counts = generator.run()
+    elapsed = clock.perf_counter() - start
+    rows = sum(counts.values())
+    print(
+        f"✅ Generated {counts['products']:,} products, {counts['orders']:,} orders, "
+        f"{counts['order_items']:,} order items, {counts['invoices']:,} invoices and "
+        f"{counts['invoice_logs']:,} invoice logs in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)."
+    )
+    bulk_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with sample data.")
+    commands = parser.add_subparsers(dest="command")
+    bulk = commands.add_parser("bulk", help="generate a large, reproducible sales history")
+    bulk.add_argument("--products", type=int, default=500, help="products to add (default: 500)")
+    bulk.add_argument("--days", type=int, default=365, help="days of sales to generate (default: 365)")
+    bulk.add_argument("--orders-per-day", type=int, default=1000, help="average orders per day (default: 1000)")
+    bulk.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    bulk.add_argument("--end", type=date.fromisoformat, help="last day of sales, YYYY-MM-DD (default: today)")
+    bulk.add_argument("--invoice-rate", type=float, default=0.9, help="share of orders that are invoiced (default: 0.9)")
+    bulk.add_argument("--log-rate", type=float, default=1.0, help="share of invoices with a logged authority response (default: 1.0)")
+    bulk.add_argument("--chunk-size", type=int, default=50000, help="orders per transaction (default: 50000)")
+    args = parser.parse_args()
+
+    if args.command == "bulk":
+        seed_bulk(args)
+    else:
+        seed_data()
+
+
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    main()
@@ -1,16 +1,213 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 import jwt
+import logging
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from dotenv import load_dotenv
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from models.models import RevokedToken
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Read once; changing SECRET_KEY needs a restart (which also drops the cache)
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
+ALGORITHM = "HS256"
+TOKEN_LIFETIME = timedelta(hours=1)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def validate_token(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
-        return payload
-    except jwt.InvalidTokenError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
\ No newline at end of file
+
+class TokenCache:
+    """Verified tokens and their claims, so a repeated token skips jwt.decode.
+
+    Terminals send the same bearer token for its whole lifetime, so after the
+    first request validation is a dictionary lookup. An entry is only trusted
+    until the token's exp (or ttl seconds for tokens without one); after that
+    the token goes through jwt.decode again, which rejects it as expired. The
+    cache is a bounded LRU of max_entries tokens. It only remembers that a
+    token is genuine; whether it has been revoked is the denylist's call.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(token)
+            if hit is None:
+                self.misses += 1
+                return None
+            expires_at, claims = hit
+            if expires_at <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        expires_at = claims.get("exp", time.time() + self.ttl)
+        with self._lock:
+            self._entries[token] = (expires_at, claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revoked": len(denylist),
+        }
+
+
+class Denylist:
+    """Revoked tokens, shared by every worker through the revoked_tokens table.
+
+    Requests check an in-memory copy, so validating a token never waits on
+    the database. A background thread reloads the copy every poll_interval
+    seconds; a token logged out in one worker is rejected by the others from
+    their next reload. Revocations made in this process are in the copy at
+    once. Rows are kept by jti (or by the token itself if it has none) until
+    the token would have expired anyway.
+    """
+
+    def __init__(self, ttl: float, poll_interval: float = 2.0):
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.engine = None  # given to start(), so building the list doesn't need a database
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __contains__(self, key: str) -> bool:
+        revoked = self._revoked
+        return bool(revoked) and key in revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def start(self, engine):
+        self.engine = engine
+        self._stop.clear()
+        # Loaded before the first request, so a new worker starts with every logout
+        self._refresh_logged()
+        self._thread = threading.Thread(target=self._run, name="token-denylist", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self._refresh_logged()
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Token denylist refresh failed: {e}")
+
+    def refresh(self):
+        """Reload the revocations that haven't expired from the database."""
+        now = time.time()
+        with Session(self.engine) as db:
+            rows = db.exec(
+                select(RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.expires_at > datetime.utcfromtimestamp(now))
+            ).all()
+        with self._lock:
+            # Keep this process's own revocations in case the read raced their commit
+            revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            revoked.update((jti, expires_at.replace(tzinfo=timezone.utc).timestamp()) for jti, expires_at in rows)
+            self._revoked = revoked
+
+    def revoke(self, db: Session, key: str, expires_at: float):
+        """Record a revocation and commit it, dropping rows that have expired."""
+        db.exec(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        if db.get(RevokedToken, key) is None:
+            db.add(RevokedToken(jti=key, expires_at=datetime.utcfromtimestamp(expires_at)))
+        db.commit()
+        with self._lock:
+            self._revoked = {**self._revoked, key: expires_at}
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+
+
+def _revocation_key(token: str, claims: dict) -> str:
+    return claims.get("jti") or token
+
+
+token_cache = TokenCache(
+    max_entries=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "3600")),
+)
+denylist = Denylist(
+    ttl=token_cache.ttl,
+    poll_interval=float(os.getenv("AUTH_DENYLIST_POLL_INTERVAL", "2.0")),
+)
+
+
+def create_token(subject: str) -> str:
+    """Sign a bearer token for subject, valid for TOKEN_LIFETIME, with a jti for revocation."""
+    return jwt.encode(
+        {"sub": subject, "exp": datetime.utcnow() + TOKEN_LIFETIME, "jti": uuid.uuid4().hex},
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+
+
+def verify_token(token: str) -> dict:
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+        token_cache.put(token, claims)
+    if _revocation_key(token, claims) in denylist:
+        raise HTTPException(status_code=401, detail="Invalid token: Token has been revoked")
+    return claims
+
+
+async def validate_token(token: str = Depends(oauth2_scheme)):
+    # async so the check runs on the event loop instead of a threadpool hop
+    return verify_token(token)
+
+
+def revoke_token(db: Session, token: str):
+    """Deny a valid token, in every worker, from now until it expires."""
+    claims = verify_token(token)
+    denylist.revoke(db, _revocation_key(token, claims), claims.get("exp", time.time() + denylist.ttl))
+    token_cache.discard(token)
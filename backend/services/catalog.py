@@ -0,0 +1,38 @@
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from models.models import CatalogState, ProductTombstone
+
+
+def current_catalog_version(db: Session) -> int:
+    version = db.exec(select(CatalogState.version).where(CatalogState.id == 1)).first()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> int:
+    """Advance the catalog version in the caller's transaction and return it.
+
+    Every product create, update and delete, and every sale, stamps the rows
+    it touches with the returned version, which is what ?since= delta sync and the /api/products
+    ETag are based on.
+    """
+    version = db.exec(
+        update(CatalogState)
+        .where(CatalogState.id == 1)
+        .values(version=CatalogState.version + 1)
+        .returning(CatalogState.version)
+    ).scalar_one_or_none()
+    if version is None:
+        version = 1
+        db.add(CatalogState(id=1, version=version))
+        db.flush()
+    return version
+
+
+def record_product_deletion(db: Session, product_id: int, version: int):
+    db.merge(ProductTombstone(product_id=product_id, version=version))
+
+
+def clear_product_deletion(db: Session, product_id: int):
+    """Drop the tombstone of a reused product id."""
+    db.exec(delete(ProductTombstone).where(ProductTombstone.product_id == product_id))
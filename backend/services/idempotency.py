@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from models.models import IdempotencyKey
+
+
+def request_hash(body) -> str:
+    """sha256 of a request body's canonical JSON, to tell a retry from a reused key."""
+    return hashlib.sha256(orjson.dumps(body, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class IdempotencyStore:
+    """Stored responses for requests sent with an Idempotency-Key header.
+
+    The idempotency_keys table is the source of truth; a bounded LRU in front
+    of it answers repeated keys without a query. Only completed responses are
+    cached and they never change, so the LRU is safe to keep per process.
+
+    Each response is stored with a hash of the request it answered. Reusing
+    a key for a different request is a client bug and gets a 422 rather than
+    someone else's response. Keys expire after ttl: an expired key is
+    treated as new, and purge() deletes them (purge_idempotency_keys.py).
+    """
+
+    def __init__(self, max_entries: int, ttl: timedelta):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (scope, key) -> (status_code, body, request_hash, created_at)
+        self._cache: OrderedDict[tuple[str, str], tuple[int, dict, Optional[str], datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, cache_key: tuple[str, str], value: tuple[int, dict, Optional[str], datetime]):
+        with self._lock:
+            self._cache[cache_key] = value
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def lookup(self, db: Session, scope: str, key: str, body_hash: str) -> Optional[tuple[int, dict]]:
+        """Return (status_code, body) stored for this key, or None.
+
+        Raises a 422 when the key was stored for a request with another hash.
+        An expired key is deleted in the caller's transaction, so the caller
+        can store it again.
+        """
+        cache_key = (scope, key)
+        expired_before = datetime.utcnow() - self.ttl
+        with self._lock:
+            hit = self._cache.get(cache_key)
+            if hit is not None and hit[3] < expired_before:
+                del self._cache[cache_key]
+                hit = None
+            if hit is not None:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if hit is None:
+            row = db.exec(
+                select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            ).first()
+            if not row:
+                return None
+            if row.created_at < expired_before:
+                db.exec(delete(IdempotencyKey).where(IdempotencyKey.id == row.id))
+                return None
+            hit = (row.status_code, json.loads(row.response), row.request_hash, row.created_at)
+            self._remember(cache_key, hit)
+
+        status_code, body, stored_hash, _ = hit
+        # Keys stored before request hashes existed match any request
+        if stored_hash is not None and stored_hash != body_hash:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key has already been used for a different request"
+            )
+        return status_code, body
+
+    def save(self, db: Session, scope: str, key: str, status_code: int, body: dict, body_hash: str):
+        """Add the response to the caller's transaction; it is cached once committed.
+
+        A concurrent request with the same key makes the caller's commit fail
+        with an IntegrityError on uq_idempotency_scope_key.
+        """
+        db.add(IdempotencyKey(
+            scope=scope, key=key, status_code=status_code, response=json.dumps(body), request_hash=body_hash
+        ))
+
+    def remember(self, scope: str, key: str, status_code: int, body: dict, body_hash: str):
+        self._remember((scope, key), (status_code, body, body_hash, datetime.utcnow()))
+
+    def purge(self, db: Session) -> int:
+        """Delete the keys older than ttl and commit; returns how many."""
+        deleted = db.exec(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - self.ttl)
+        ).rowcount
+        db.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        return {"entries": len(self._cache), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+idempotency_store = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    # Long enough for a terminal's offline queue to be replayed
+    ttl=timedelta(hours=float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "168"))),
+)
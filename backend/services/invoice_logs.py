@@ -0,0 +1,120 @@
+import gzip
+import json
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from models.models import InvoiceLog, InvoiceOutbox
+
+SUCCESS_RESULT_CODE = "000"
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def compress_response(response) -> bytes:
+    """zlib-compressed JSON of an authority response, as stored in invoice_logs.response."""
+    return zlib.compress(orjson.dumps(response, option=orjson.OPT_NON_STR_KEYS), 6)
+
+
+def response_text(stored) -> str:
+    """The JSON text of a stored response.
+
+    Rows written before responses were compressed hold the JSON as text;
+    they are passed through unchanged until migrate.py rewrites them.
+    """
+    if isinstance(stored, str):
+        return stored
+    return zlib.decompress(stored).decode()
+
+
+def response_fragment(stored) -> orjson.Fragment:
+    """A stored response that orjson writes into a larger document verbatim,
+    so it is never parsed and re-serialised on its way to the client."""
+    return orjson.Fragment(stored if isinstance(stored, str) else zlib.decompress(stored))
+
+
+def response_fields(response) -> dict:
+    """The indexed columns promoted out of an authority response.
+
+    The ZRA API answers with resultCd ("000" is success) and the receipt
+    number in data.rcptNo; the mock authority and the client's own error
+    results use status / authority_reference instead.
+    """
+    if not isinstance(response, dict):
+        return {"status": "failed", "result_code": None, "receipt_no": None}
+    result_code = response.get("resultCd")
+    data = response.get("data") if isinstance(response.get("data"), dict) else {}
+    receipt_no = data.get("rcptNo") or response.get("authority_reference")
+    failed = response.get("status") == "ERROR" or (result_code is not None and str(result_code) != SUCCESS_RESULT_CODE)
+    return {
+        "status": "failed" if failed else "success",
+        "result_code": str(result_code) if result_code is not None else response.get("status"),
+        "receipt_no": str(receipt_no) if receipt_no is not None else None,
+    }
+
+
+def invoice_log_row(cis_invc_no: str, response) -> dict:
+    """Column values for one invoice_logs row, for bulk inserts."""
+    return {"cis_invc_no": str(cis_invc_no), "response": compress_response(response), **response_fields(response)}
+
+
+def new_invoice_log(cis_invc_no: str, response) -> InvoiceLog:
+    return InvoiceLog(**invoice_log_row(cis_invc_no, response))
+
+
+def archive_invoice_logs(db: Session, before: datetime, archive_dir: Optional[Path]) -> int:
+    """Move invoice logs created before `before` out of the database.
+
+    Rows go, oldest first in batches of ARCHIVE_BATCH_SIZE, to a gzipped
+    NDJSON file in archive_dir (nothing is written when it is None) and are
+    then deleted. Outbox rows pointing at an archived log keep their status
+    but lose the link. Each batch is committed on its own, so an interrupted
+    run can simply be started again. Returns the number of rows archived.
+    """
+    archived = 0
+    archive = None
+    try:
+        while True:
+            rows = db.exec(
+                select(InvoiceLog)
+                .where(InvoiceLog.created_at < before)
+                .order_by(InvoiceLog.created_at, InvoiceLog.id)
+                .limit(ARCHIVE_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            ids = [r.id for r in rows]
+            if archive_dir is not None:
+                if archive is None:
+                    archive_dir.mkdir(parents=True, exist_ok=True)
+                    path = archive_dir / f"invoice-logs-before-{before:%Y%m%dT%H%M%S}.ndjson.gz"
+                    archive = gzip.open(path, "at", encoding="utf-8")
+                for r in rows:
+                    line = json.dumps({
+                        "id": r.id,
+                        "cis_invc_no": r.cis_invc_no,
+                        "created_at": r.created_at.isoformat(),
+                        "status": r.status,
+                        "result_code": r.result_code,
+                        "receipt_no": r.receipt_no,
+                    }, separators=(",", ":"))
+                    archive.write(f'{line[:-1]},"response":{response_text(r.response)}}}\n')
+                archive.flush()
+            db.exec(
+                update(InvoiceOutbox)
+                .where(InvoiceOutbox.invoice_log_id.in_(ids))
+                .values(invoice_log_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.exec(delete(InvoiceLog).where(InvoiceLog.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+            db.expunge_all()
+            archived += len(ids)
+    finally:
+        if archive is not None:
+            archive.close()
+    return archived
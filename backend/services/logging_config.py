@@ -0,0 +1,111 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+class RecordQueueHandler(QueueHandler):
+    """Puts records on the queue as they are, message and args unmerged.
+
+    The stock QueueHandler.prepare() formats the record on the calling thread
+    so it can be pickled; this queue never leaves the process, so that work
+    (including serialising a LazyJson argument) is left to the listener.
+    Arguments are read when the listener gets to the record, so don't log an
+    object and then change it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RecordQueueListener(QueueListener):
+    """Merges each record's message and args once, on the listener thread,
+    so the console and file handlers don't each render them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        try:
+            record.msg, record.args = record.getMessage(), None
+        except Exception:
+            # Left as is; the handlers' own format() reports it via handleError
+            pass
+        return record
+
+
+def configure_logging(logs_dir: Path) -> QueueListener:
+    """Route all logging through a queue drained by a background thread.
+
+    Request threads only put the unformatted records on an in-memory queue; a
+    listener thread formats them and writes to the console and to logs/app.log, which
+    rotates at LOG_MAX_BYTES (10 MB) keeping LOG_BACKUP_COUNT (5) old files.
+    The level comes from LOG_LEVEL (INFO). Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = RotatingFileHandler(
+        logs_dir / "app.log",
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8",
+        delay=True,
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(RecordQueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = RecordQueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class LazyJson:
+    """Serialises its payload only if a handler actually formats the record."""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        return json.dumps(self.payload, default=str)
+
+
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+
+
+def log_payload(logger: logging.Logger, message: str, payload, level: int = logging.DEBUG):
+    """Log a request/response payload for a sample of calls.
+
+    Nothing is serialised unless the level is enabled and the call falls in
+    the LOG_PAYLOAD_SAMPLE_RATE sample (default 10%).
+    """
+    if logger.isEnabledFor(level) and random.random() < PAYLOAD_SAMPLE_RATE:
+        logger.log(level, "%s: %s", message, LazyJson(payload))
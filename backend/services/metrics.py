@@ -0,0 +1,312 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+class Metric:
+    """A named family of samples, one per combination of label values.
+
+    Label values are passed positionally in labelnames order. Each metric
+    keeps its own lock; updates are a dict lookup and an add under it.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, values: tuple) -> str:
+        if not values:
+            return ""
+        pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+        return "{" + pairs + "}"
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(labels)} {_number(value)}" for labels, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Observations counted into fixed upper-bound buckets, plus their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        lines = []
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._bucket_labels(labels, bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return lines
+
+    def _bucket_labels(self, labels: tuple, bound) -> str:
+        le = f'le="{bound if bound == "+Inf" else _number(bound)}"'
+        inner = self._labels(labels)
+        return "{" + (inner[1:-1] + "," if inner else "") + le + "}"
+
+
+class Registry:
+    """The metrics of this process and their Prometheus text rendering.
+
+    Caches are registered as callbacks returning their stats() dict (with
+    hits, misses and entries) and are read at scrape time, so they cost
+    nothing between scrapes.
+    """
+
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        self._caches: dict[str, Callable[[], dict]] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, stats: Callable[[], dict]):
+        self._caches[name] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        lines.extend(self._cache_samples())
+        return "\n".join(lines) + "\n"
+
+    def _cache_samples(self) -> list[str]:
+        if not self._caches:
+            return []
+        stats = {name: fn() for name, fn in self._caches.items()}
+        lines = []
+        for name, kind, documentation, value in (
+            ("cache_hits_total", "counter", "Cache lookups answered from memory.", lambda s: s["hits"]),
+            ("cache_misses_total", "counter", "Cache lookups that fell through to the database.", lambda s: s["misses"]),
+            ("cache_entries", "gauge", "Entries currently held by the cache.", lambda s: s["entries"]),
+            ("cache_hit_ratio", "gauge", "Hits over lookups since the process started.", _hit_ratio),
+        ):
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f'{name}{{cache="{cache}"}} {_number(value(s))}' for cache, s in stats.items())
+        return lines
+
+
+def _hit_ratio(stats: dict) -> float:
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to serve a request, body included.", ("method", "route")))
+HTTP_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "Requests currently being served.", ("method",)))
+HTTP_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "Database queries issued while serving a request.", ("method", "route"),
+    buckets=COUNT_BUCKETS))
+HTTP_DB_TIME = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time a request spent waiting on database queries.", ("method", "route")))
+DB_QUERIES = registry.register(Histogram(
+    "db_query_duration_seconds", "Database statement execution time.", ("engine", "operation"),
+    buckets=QUERY_BUCKETS))
+DB_CONNECTIONS = registry.register(Gauge(
+    "db_connections_in_use", "Connections checked out of the pool.", ("engine",)))
+SECTION_LATENCY = registry.register(Histogram(
+    "section_duration_seconds", "Time spent in instrumented sections of the hot paths.", ("section",)))
+TAX_REQUESTS = registry.register(Counter(
+    "tax_requests_total", "Calls to the tax authority by outcome.", ("endpoint", "outcome")))
+TAX_LATENCY = registry.register(Histogram(
+    "tax_request_duration_seconds", "Tax authority call time, retries and backoff included.", ("endpoint",)))
+TAX_RETRIES = registry.register(Counter(
+    "tax_retries_total", "Retried tax authority requests.", ("endpoint",)))
+TAX_IN_PROGRESS = registry.register(Gauge(
+    "tax_requests_in_progress", "Tax authority calls currently in flight.", ("endpoint",)))
+
+# [query count, query seconds] of the request being served, set by MetricsMiddleware
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+@contextmanager
+def timed(section: str):
+    """Record the time spent in the block under section_duration_seconds{section}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_LATENCY.observe(time.perf_counter() - start, section)
+
+
+def observe_tax_call(endpoint: str, seconds: float, retries: int, result):
+    failed = not isinstance(result, dict) or result.get("status") == "ERROR"
+    TAX_REQUESTS.inc(endpoint, "error" if failed else "success")
+    TAX_LATENCY.observe(seconds, endpoint)
+    if retries:
+        TAX_RETRIES.inc(endpoint, amount=retries)
+
+
+_operations: dict[str, str] = {}
+
+
+def _operation(statement: str) -> str:
+    # Statements are compiled once and cached, so the same few strings come back
+    operation = _operations.get(statement)
+    if operation is None:
+        operation = statement.lstrip()[:6].upper()
+        operation = operation if operation in DB_OPERATIONS else "OTHER"
+        if len(_operations) < 10000:
+            _operations[statement] = operation
+    return operation
+
+
+def instrument_engine(engine: Engine, name: str):
+    """Time every statement run on engine and track its checked-out connections.
+
+    Statements are labelled by their leading keyword; the time also counts
+    towards the request being served, if any. Raw DBAPI connections taken
+    from the pool show up as checked out but their statements are not timed.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        DB_QUERIES.observe(elapsed, name, _operation(statement))
+        request = _request_db.get()
+        if request is not None:
+            request[0] += 1
+            request[1] += elapsed
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        DB_CONNECTIONS.inc(name)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        DB_CONNECTIONS.dec(name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency, status and database work of each request.
+
+    Requests are labelled by their route template (/api/products/{product_id}),
+    or "unmatched" for paths no route handles, so label cardinality stays
+    bounded. Requests slower than slow_request_seconds are also logged.
+    """
+
+    def __init__(self, app, slow_request_seconds: float = 1.0):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        HTTP_IN_PROGRESS.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec(method)
+            _request_db.reset(token)
+            # FastAPI puts the matched APIRoute in the scope while routing
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(method, path, status_code)
+            HTTP_LATENCY.observe(elapsed, method, path)
+            HTTP_DB_QUERIES.observe(db[0], method, path)
+            HTTP_DB_TIME.observe(db[1], method, path)
+            if elapsed >= self.slow_request_seconds:
+                logger.warning(
+                    "Slow request: %s %s took %.3fs (%d queries, %.3fs in the database)",
+                    method, path, elapsed, db[0], db[1],
+                )
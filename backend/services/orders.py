@@ -0,0 +1,96 @@
+from collections import defaultdict
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import case, insert, update
+from sqlmodel import Session, select
+
+from models.models import Order, OrderItem, Product
+from services.catalog import bump_catalog_version
+from services.metrics import timed
+from services.product_cache import product_cache
+from services.rollups import record_order
+
+
+def place_order(db: Session, items) -> Order:
+    """Create one Order with its OrderItems and decrement stock.
+
+    Uses a fixed number of statements regardless of cart size: prices come
+    from the product cache (one SELECT ... IN (...) for any misses), stock is
+    decremented by one conditional UPDATE ... RETURNING (plus the catalog
+    version bump, stamped on the same rows) and the line items are written
+    with one bulk INSERT, followed by the daily rollup upserts. The caller
+    owns the transaction (commit/rollback).
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="Cannot create an empty order")
+
+    # Merge repeated product ids so each product is checked and decremented once
+    quantities: dict[int, int] = defaultdict(int)
+    for item in items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail=f"Invalid quantity for product {item.product_id}")
+        quantities[item.product_id] += item.quantity
+
+    with timed("order_product_lookup"):
+        by_id = product_cache.get_many(db, quantities.keys())
+    for product_id in quantities:
+        if product_id not in by_id:
+            raise HTTPException(status_code=404, detail=f"Product with id {product_id} not found")
+
+    # Stock is checked by the UPDATE itself, never from the (possibly cached) rows
+    # Plain Core statements from here on: the ORM's bookkeeping cost more than
+    # the SQL itself for a one-line order
+    products = Product.__table__
+    with timed("order_stock_update"):
+        version = bump_catalog_version(db)
+        qty = case(quantities, value=products.c.id)
+        updated = db.connection().execute(
+            update(products)
+            .where(products.c.id.in_(quantities.keys()), products.c.stock >= qty)
+            .values(stock=products.c.stock - qty, version=version)
+            .returning(products.c.id)
+        ).scalars().all()
+    if len(updated) != len(quantities):
+        raise stock_error(db, quantities, updated)
+
+    lines = [
+        {
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": by_id[item.product_id].price,
+            "line_total": by_id[item.product_id].price * item.quantity,
+        }
+        for item in items
+    ]
+
+    order = {
+        "product_id": items[0].product_id,
+        "quantity": sum(line["quantity"] for line in lines),
+        "total_price": sum(line["line_total"] for line in lines),
+        "order_date": date.today(),
+    }
+    orders = Order.__table__
+    order["id"] = db.connection().execute(insert(orders).returning(orders.c.id), order).scalar_one()
+
+    for line in lines:
+        line["order_id"] = order["id"]
+    db.connection().execute(insert(OrderItem.__table__), lines)
+    record_order(db, order["order_date"], lines)
+
+    # Not added to the session: callers only read it
+    return Order(**order)
+
+
+def stock_error(db: Session, quantities: dict[int, int], updated) -> HTTPException:
+    """Explain why the stock UPDATE skipped some rows; the caller rolls back.
+
+    updated holds the ids the UPDATE did change; any other product in the
+    cart was deleted meanwhile or short of stock.
+    """
+    skipped = [product_id for product_id in quantities if product_id not in updated]
+    names = dict(db.exec(select(Product.id, Product.name).where(Product.id.in_(skipped))).all())
+    for product_id in skipped:
+        if product_id not in names:
+            return HTTPException(status_code=404, detail=f"Product with id {product_id} not found")
+    return HTTPException(status_code=400, detail=f"Not enough stock for {names[skipped[0]]}")
@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from models.models import InvoiceOutbox
+from services.invoice_logs import new_invoice_log
+
+logger = logging.getLogger(__name__)
+
+DUE_STATUSES = ("pending", "in_progress")
+# 4xx answers that can succeed on a later attempt; any other 4xx means the
+# authority rejected the invoice itself, and sending it again won't change that
+RETRIABLE_CLIENT_ERRORS = (408, 429)
+
+
+def is_retriable(response: dict) -> bool:
+    """Whether a failed submission is worth another attempt.
+
+    Network failures and 5xx answers are; 4xx answers other than 408 and 429
+    are not. The tax client puts the HTTP status in "status_code".
+    """
+    status_code = response.get("status_code")
+    if status_code is None or status_code in RETRIABLE_CLIENT_ERRORS:
+        return True
+    return not 400 <= status_code < 500
+
+
+def enqueue_invoice(db: Session, cis_invc_no: str, payload: dict) -> InvoiceOutbox:
+    """Add a transformed invoice to the outbox in the caller's transaction."""
+    row = InvoiceOutbox(cis_invc_no=cis_invc_no, payload=json.dumps(payload))
+    db.add(row)
+    db.flush()
+    return row
+
+
+class OutboxWorker:
+    """Drains invoice_outbox in the background and records results in InvoiceLog.
+
+    Due rows are claimed with a conditional UPDATE that pushes next_attempt_at
+    out by a lease, so several processes can run workers against the same
+    database and a row held by a crashed worker is picked up again once its
+    lease expires. Failed attempts are rescheduled with exponential backoff
+    until max_attempts, after which the row is marked "failed". A rejection
+    that retrying can't fix (see is_retriable) is marked "failed" at once.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[dict], dict],
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        max_attempts: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        lease_seconds: float = 120.0,
+    ):
+        self.engine = None  # given to start(), so building the worker doesn't need a database
+        self.submit = submit
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = timedelta(seconds=lease_seconds)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self, engine):
+        self.engine = engine
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="outbox-submit")
+        self._thread = threading.Thread(target=self._run, name="invoice-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def notify(self):
+        """Wake the worker now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.claim_due()
+            except Exception as e:
+                logger.error(f"Outbox claim failed: {e}")
+                claimed = []
+            if claimed:
+                wait([self._executor.submit(self.deliver, *row) for row in claimed])
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def claim_due(self) -> list[tuple[int, str, str]]:
+        """Claim up to `concurrency` due rows; returns (id, cis_invc_no, payload)."""
+        now = datetime.utcnow()
+        lease_until = now + self.lease
+        with Session(self.engine) as db:
+            due_ids = db.exec(
+                select(InvoiceOutbox.id)
+                .where(InvoiceOutbox.status.in_(DUE_STATUSES), InvoiceOutbox.next_attempt_at <= now)
+                .order_by(InvoiceOutbox.next_attempt_at)
+                .limit(self.concurrency)
+            ).all()
+            if not due_ids:
+                return []
+            db.exec(
+                update(InvoiceOutbox)
+                .where(
+                    InvoiceOutbox.id.in_(due_ids),
+                    InvoiceOutbox.status.in_(DUE_STATUSES),
+                    InvoiceOutbox.next_attempt_at <= now,
+                )
+                .values(
+                    status="in_progress",
+                    attempts=InvoiceOutbox.attempts + 1,
+                    next_attempt_at=lease_until,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            # Rows another worker claimed first carry a different lease
+            return db.exec(
+                select(InvoiceOutbox.id, InvoiceOutbox.cis_invc_no, InvoiceOutbox.payload).where(
+                    InvoiceOutbox.id.in_(due_ids),
+                    InvoiceOutbox.status == "in_progress",
+                    InvoiceOutbox.next_attempt_at == lease_until,
+                )
+            ).all()
+
+    def deliver(self, outbox_id: int, cis_invc_no: str, payload: str):
+        try:
+            response = self.submit(json.loads(payload))
+            error = response.get("message", "ERROR") if response.get("status") == "ERROR" else None
+        except Exception as e:
+            response, error = {"status": "ERROR", "message": str(e)}, str(e)
+
+        with Session(self.engine) as db:
+            row = db.get(InvoiceOutbox, outbox_id)
+            now = datetime.utcnow()
+            row.updated_at = now
+            row.last_error = error
+            if error is None or row.attempts >= self.max_attempts or not is_retriable(response):
+                log = new_invoice_log(cis_invc_no, response)
+                db.add(log)
+                db.flush()
+                row.invoice_log_id = log.id
+                row.status = "sent" if error is None else "failed"
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (row.attempts - 1))
+                row.status = "pending"
+                row.next_attempt_at = now + timedelta(seconds=delay)
+            attempts, status = row.attempts, row.status
+            db.add(row)
+            db.commit()
+        if error:
+            logger.warning(f"Invoice {cis_invc_no} attempt {attempts} failed ({status}): {error}")
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from sqlmodel import Session, select
+
+from models.models import Product, ProductTombstone
+from services.catalog import current_catalog_version
+
+
+class ProductCache:
+    """Read-through LRU of products by id.
+
+    Writes in this process call invalidate() after committing. Writes made by
+    other processes are picked up through the catalog version: at most every
+    check_interval seconds the cache compares its version with catalog_state
+    and evicts the products changed or deleted since, so a cached row is never
+    older than check_interval.
+    """
+
+    def __init__(self, max_entries: int, check_interval: float):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # Bumped by every invalidation so a read that raced a write isn't cached
+        self._generation = 0
+
+    def _sync(self, db: Session):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        version = current_catalog_version(db)
+        self._checked_at = now
+        if version == self._version:
+            return
+        if self._version is None or version < self._version:
+            self.clear()
+        else:
+            changed = db.exec(select(Product.id).where(Product.version > self._version)).all()
+            deleted = db.exec(select(ProductTombstone.product_id).where(ProductTombstone.version > self._version)).all()
+            self.invalidate([*changed, *deleted])
+        self._version = version
+
+    def get_many(self, db: Session, product_ids: Iterable[int]) -> dict[int, Product]:
+        """Return the existing products among product_ids, keyed by id."""
+        self._sync(db)
+        found: dict[int, dict] = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for product_id in product_ids:
+                data = self._entries.get(product_id)
+                if data is None:
+                    missing.append(product_id)
+                else:
+                    self._entries.move_to_end(product_id)
+                    found[product_id] = data
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            rows = db.exec(select(Product).where(Product.id.in_(missing))).all()
+            loaded = {row.id: row.model_dump() for row in rows}
+            found.update(loaded)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries.update(loaded)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+
+        return {product_id: Product(**data) for product_id, data in found.items()}
+
+    def get(self, db: Session, product_id: int) -> Optional[Product]:
+        return self.get_many(db, [product_id]).get(product_id)
+
+    def invalidate(self, product_ids: Iterable[int]):
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "catalog_version": self._version,
+        }
+
+
+product_cache = ProductCache(
+    max_entries=int(os.getenv("PRODUCT_CACHE_SIZE", "5000")),
+    check_interval=float(os.getenv("PRODUCT_CACHE_CHECK_INTERVAL", "1.0")),
+)
@@ -0,0 +1,307 @@
+import asyncio
+import contextlib
+import cProfile
+import functools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE_HEADER = "X-Profile-File"
+PROFILE_MODES = ("cprofile", "sample")
+
+
+class Capture:
+    """One request's profile, taken in the thread that runs its endpoint.
+
+    "cprofile" records every call and is written as a pstats file (snakeviz,
+    `python -m pstats`); "sample" grabs the thread's stack every interval
+    seconds and is written as collapsed stacks, one "frame;frame;... count"
+    line each, which flamegraph.pl and speedscope read directly. Only one
+    capture runs at a time per process; a request arriving while another is
+    being profiled is served without one. An async endpoint's thread is the
+    event loop, so it is profiled inside LoopGate.exclusive() to keep other
+    requests' endpoints out of its profile.
+    """
+
+    def __init__(self, profiler: "Profiler", method: str, route: str):
+        self.profiler = profiler
+        self.method = method
+        self.route = route
+        self.filename: Optional[str] = None
+        self._started = False
+
+    def __enter__(self):
+        if not self.profiler._lock.acquire(blocking=False):
+            return self
+        self._started = True
+        self._start = time.perf_counter()
+        if self.profiler.mode == "sample":
+            self._sampler = StackSampler(threading.get_ident(), self.profiler.sample_interval)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if not self._started:
+            return False
+        try:
+            if self.profiler.mode == "sample":
+                self._sampler.stop()
+            else:
+                self._profile.disable()
+            elapsed_ms = (time.perf_counter() - self._start) * 1000
+            self.filename = self._write(elapsed_ms)
+        except Exception:
+            logger.exception("Could not write profile of %s %s", self.method, self.route)
+        finally:
+            self.profiler._lock.release()
+        return False
+
+    def _write(self, elapsed_ms: float) -> str:
+        directory = self.profiler.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = self.route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        extension = "folded" if self.profiler.mode == "sample" else "prof"
+        filename = f"{stamp}-{self.method}-{slug}-{elapsed_ms:.0f}ms.{extension}"
+        if self.profiler.mode == "sample":
+            self._sampler.dump(directory / filename)
+        else:
+            self._profile.dump_stats(directory / filename)
+        self.profiler._prune()
+        logger.info("Profiled %s %s (%.1f ms) to %s", self.method, self.route, elapsed_ms, filename)
+        return filename
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def dump(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class LoopGate:
+    """Lets a profiled async endpoint run alone on the event loop.
+
+    Unprofiled async endpoints run under shared(), any number at once. A
+    profiled one enters exclusive(), which stops new endpoints from starting
+    and waits for the running ones to finish, so its profile only holds its
+    own work. Requests wait for the profiled one to finish. Middleware and
+    response rendering of other requests can still run meanwhile; sync
+    endpoints run in worker threads and never show up.
+    """
+
+    def __init__(self):
+        self._running = 0
+        self._exclusive = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # One per event loop; tests and benchmarks can run several in turn
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._condition = loop, asyncio.Condition()
+        return self._condition
+
+    @contextlib.asynccontextmanager
+    async def shared(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self._exclusive)
+            self._running += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self._running -= 1
+                condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def exclusive(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self._exclusive)
+            self._exclusive = True
+            try:
+                await condition.wait_for(lambda: self._running == 0)
+            except BaseException:
+                # Cancelled while waiting: let the others carry on
+                self._exclusive = False
+                condition.notify_all()
+                raise
+        try:
+            yield
+        finally:
+            async with condition:
+                self._exclusive = False
+                condition.notify_all()
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """Decides which requests get profiled and where the profiles go.
+
+    A request is profiled when it carries X-Profile with the PROFILE_SECRET
+    value, or when its route template is in PROFILE_ROUTES (all routes if
+    that is empty) and it falls in the PROFILE_SAMPLE_RATE sample. With no
+    secret and a zero rate the profiler is disabled and the app keeps its
+    plain routes, so leaving this compiled in costs nothing.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        mode: str = "cprofile",
+        secret: Optional[str] = None,
+        routes: frozenset = frozenset(),
+        sample_rate: float = 0.0,
+        sample_interval: float = 0.005,
+        max_files: int = 200,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"PROFILE_MODE must be one of {', '.join(PROFILE_MODES)}, not {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self.secret = secret
+        self.routes = routes
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self.loop_gate = LoopGate()
+
+    @classmethod
+    def from_env(cls, directory: Path):
+        routes = frozenset(r.strip() for r in os.getenv("PROFILE_ROUTES", "").split(",") if r.strip())
+        return cls(
+            directory=Path(os.getenv("PROFILE_DIR", str(directory))),
+            mode=os.getenv("PROFILE_MODE", "cprofile").lower(),
+            secret=os.getenv("PROFILE_SECRET") or None,
+            routes=routes,
+            # Naming routes means "profile these", so they default to every request
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "1.0" if routes else "0.0")),
+            sample_interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005")),
+            max_files=int(os.getenv("PROFILE_MAX_FILES", "200")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.secret is not None or self.sample_rate > 0
+
+    def wants(self, request: Request, route: str) -> bool:
+        if self.secret is not None and request.headers.get(PROFILE_HEADER) == self.secret:
+            return True
+        if self.sample_rate <= 0 or (self.routes and route not in self.routes):
+            return False
+        return random.random() < self.sample_rate
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.*"), key=lambda p: p.stat().st_mtime)
+        for old in files[:max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+profiler = Profiler.from_env(Path(__file__).resolve().parent.parent / "logs" / "profiles")
+
+# The capture the current request's endpoint should run under, set by ProfiledRoute
+_capture: ContextVar[Optional[Capture]] = ContextVar("profile_capture", default=None)
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    # The endpoint is wrapped rather than the route handler because FastAPI
+    # runs sync endpoints in a worker thread, and that is the thread to profile
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            capture = _capture.get()
+            if capture is None:
+                async with profiler.loop_gate.shared():
+                    return await endpoint(*args, **kwargs)
+            async with profiler.loop_gate.exclusive():
+                with capture:
+                    return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            capture = _capture.get()
+            if capture is None:
+                return endpoint(*args, **kwargs)
+            with capture:
+                return endpoint(*args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint is profiled when the profiler picks the request.
+
+    Install with app.router.route_class = ProfiledRoute before declaring
+    routes. The profile's file name comes back in X-Profile-File.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request):
+            if not profiler.wants(request, self.path):
+                return await handler(request)
+            capture = Capture(profiler, request.method, self.path)
+            token = _capture.set(capture)
+            try:
+                response = await handler(request)
+            finally:
+                _capture.reset(token)
+            if capture.filename:
+                response.headers[PROFILE_FILE_HEADER] = capture.filename
+            return response
+
+        return profiled_handler
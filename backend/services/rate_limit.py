@@ -0,0 +1,200 @@
+import itertools
+import logging
+import threading
+import time
+from importlib.metadata import version
+from typing import Callable
+
+from fastapi import HTTPException, Request
+from limits.storage import Storage
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from sqlalchemy import bindparam, delete, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import select
+
+from models.models import RateLimitCounter
+from services.auth import verify_token
+
+logger = logging.getLogger(__name__)
+
+PURGE_EVERY = 1000
+
+# threadpool_limit_check() reaches into slowapi internals, as of this version
+# (the pin in requirements.txt): Limiter._check_request_limit(request, func,
+# in_middleware) and the request.state._rate_limiting_complete flag that the
+# endpoint wrappers check before calling it
+SLOWAPI_VERSION = "0.1.9"
+
+
+class DatabaseStorage(Storage):
+    """Rate-limit counters in a SQL table, shared by every worker using it.
+
+    Registered with limits for these storage URIs:
+      db://                  the application's own database
+      sqlite:///path.db      a separate SQLite file (WAL, like the main engine)
+      postgresql://...       a separate PostgreSQL database
+
+    Supports the fixed-window strategy (slowapi's default). Each hit is one
+    upsert that starts a new window once the old one has expired; expired
+    rows are purged every PURGE_EVERY hits. The upsert runs on a raw DBAPI
+    connection from the engine's pool (about 60 us on SQLite against 300 us
+    through a Connection), and the count and expiry it returns are kept per
+    key to answer the header lookups slowapi makes after the hit, so a
+    limited request costs one statement. Every call blocks on the database:
+    async endpoints must hit the limit from a threadpool (see
+    threadpool_limit_check), never on the event loop.
+    """
+
+    STORAGE_SCHEME = ["db", "sqlite", "postgresql"]
+
+    def __init__(self, uri: str = "db://", wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions, **options)
+        self._uri = uri
+        self._engine = None
+        self._setup_lock = threading.Lock()
+        self._hits = itertools.count(1)
+        # key -> (count, expires_at) from this process's latest hit; read back
+        # for the headers, possibly on another thread than the hit
+        self._windows: dict[str, tuple[int, float]] = {}
+
+    @property
+    def engine(self):
+        # Connected on the first hit, not when the Limiter is built at import
+        if self._engine is None:
+            with self._setup_lock:
+                if self._engine is None:
+                    self._setup()
+        return self._engine
+
+    def _setup(self):
+        from models.database import get_engine, make_engine, writer
+        engine = get_engine() if self._uri.startswith("db://") else make_engine(self._uri)
+        # Workers starting together race to create the table; BEGIN IMMEDIATE makes them queue
+        RateLimitCounter.__table__.create(writer(engine), checkfirst=True)
+
+        # Written out as text because SQLAlchemy recompiles ON CONFLICT
+        # constructs on every execution; compiled once to the driver's dialect
+        incr = text(
+            "INSERT INTO rate_limit_counters (key, count, expires_at) VALUES (:key, :amount, :expires_at) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "count = CASE WHEN rate_limit_counters.expires_at <= :now THEN :amount "
+            "ELSE rate_limit_counters.count + :amount END, "
+            "expires_at = CASE WHEN rate_limit_counters.expires_at <= :now THEN :expires_at "
+            "ELSE rate_limit_counters.expires_at END "
+            "RETURNING count, expires_at"
+        ).compile(dialect=engine.dialect)
+        self._incr_sql = incr.string
+        self._incr_positions = incr.positiontup
+        table = RateLimitCounter.__table__
+        self._window = select(table.c.count, table.c.expires_at).where(table.c.key == bindparam("key"))
+        self._purge = delete(table).where(table.c.expires_at <= bindparam("now"))
+        self._engine = engine
+
+    @property
+    def base_exceptions(self):
+        return (SQLAlchemyError, self.engine.dialect.dbapi.Error)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        engine = self.engine
+        now = time.time()
+        params = {"key": key, "amount": amount, "now": now, "expires_at": now + expiry}
+        if self._incr_positions:
+            params = [params[name] for name in self._incr_positions]
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self._incr_sql, params)
+            count, expires_at = cursor.fetchone()
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+        if next(self._hits) % PURGE_EVERY == 0:
+            with engine.begin() as conn:
+                conn.execute(self._purge, {"now": now})
+            for stale in [k for k, (_, expires) in list(self._windows.items()) if expires <= now]:
+                self._windows.pop(stale, None)
+        self._windows[key] = (count, expires_at)
+        return count
+
+    def _get_window(self, key: str) -> tuple[int, float]:
+        """(count, expires_at) of the key's current window, or (0, now) if it has none."""
+        now = time.time()
+        last = self._windows.get(key)
+        if last is not None:
+            count, expires_at = last
+        else:
+            with self.engine.connect() as conn:
+                row = conn.execute(self._window, {"key": key}).first()
+            count, expires_at = row if row else (0, now)
+        return (count, expires_at) if expires_at > now else (0, now)
+
+    def get(self, key: str) -> int:
+        return self._get_window(key)[0]
+
+    def get_expiry(self, key: str) -> float:
+        return self._get_window(key)[1]
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(select(1))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self) -> int:
+        self._windows.clear()
+        with self.engine.begin() as conn:
+            return conn.execute(delete(RateLimitCounter)).rowcount
+
+    def clear(self, key: str) -> None:
+        self._windows.pop(key, None)
+        with self.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(RateLimitCounter.key == key))
+
+
+def threadpool_limit_check(limiter: Limiter) -> Callable[[Request], None]:
+    """A route dependency that hits an async endpoint's limit off the event loop.
+
+    slowapi checks limits inside its endpoint wrapper, which for an async
+    endpoint runs on the event loop, and DatabaseStorage makes a blocking
+    database call. As a sync dependency the check runs first, in FastAPI's
+    threadpool, and marks the request done so the wrapper skips it. Fails
+    at startup if slowapi no longer has the method it calls.
+    """
+    if not callable(getattr(limiter, "_check_request_limit", None)):
+        raise RuntimeError(
+            f"slowapi {version('slowapi')} has no Limiter._check_request_limit; "
+            f"threadpool_limit_check was written against slowapi {SLOWAPI_VERSION}"
+        )
+    if version("slowapi") != SLOWAPI_VERSION:
+        logger.warning(
+            "threadpool_limit_check relies on slowapi %s internals; check it against %s",
+            SLOWAPI_VERSION, version("slowapi"),
+        )
+
+    def check_rate_limit(request: Request):
+        if limiter.enabled and not getattr(request.state, "_rate_limiting_complete", False):
+            limiter._check_request_limit(request, request.scope["endpoint"], False)
+            request.state._rate_limiting_complete = True
+
+    return check_rate_limit
+
+
+def token_key(request: Request) -> str:
+    """Rate-limit key of a request: its bearer token, or the client address without one.
+
+    Each terminal holds its own token, so a busy terminal only uses up its
+    own budget. Tokens are identified by jti; the token is already verified
+    (and cached) by the time the limit is checked.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            claims = verify_token(token)
+        except HTTPException:
+            return get_remote_address(request)
+        return f"token:{claims.get('jti') or claims.get('sub')}"
+    return get_remote_address(request)
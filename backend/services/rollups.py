@@ -0,0 +1,148 @@
+import functools
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, exists, insert, text
+from sqlalchemy.sql import func
+from sqlmodel import Session, select
+
+from models.models import DailyProductSalesRollup, DailySalesRollup, Invoice, Order, OrderItem
+
+DAILY_ZERO = {
+    "order_count": 0,
+    "items_sold": 0,
+    "total_sales": 0.0,
+    "invoice_count": 0,
+    "invoice_total": 0.0,
+    "tax_total": 0.0,
+}
+
+
+def as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+@functools.lru_cache(maxsize=None)
+def _upsert(model, keys: tuple[str, ...], columns: tuple[str, ...]):
+    # The dialects' insert().on_conflict_do_update() has no cache key, so it
+    # would be compiled again on every order. SQLite and PostgreSQL share the
+    # ON CONFLICT syntax, so the statement is written out once as text.
+    table = model.__table__
+    sets = ", ".join(f"{c} = {table.name}.{c} + excluded.{c}" for c in columns if c not in keys)
+    return text(
+        f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {sets}"
+    ).bindparams(*(bindparam(c, type_=table.c[c].type) for c in columns))
+
+
+def _increment(db: Session, model, keys: list[str], rows: list[dict]):
+    """INSERT the rows, or add their values onto the existing rollup rows."""
+    # executemany, so one statement however many rows there are
+    db.connection().execute(_upsert(model, tuple(keys), tuple(rows[0])), rows)
+
+
+def record_order(db: Session, sales_date, lines: list[dict]):
+    """Add one order's lines to the rollups in the caller's transaction."""
+    sales_date = as_date(sales_date)
+    per_product: dict[int, dict] = defaultdict(lambda: {"quantity": 0, "total_sales": 0.0})
+    for line in lines:
+        per_product[line["product_id"]]["quantity"] += line["quantity"]
+        per_product[line["product_id"]]["total_sales"] += line["line_total"]
+
+    _increment(db, DailySalesRollup, ["sales_date"], [{
+        **DAILY_ZERO,
+        "sales_date": sales_date,
+        "order_count": 1,
+        "items_sold": sum(p["quantity"] for p in per_product.values()),
+        "total_sales": sum(p["total_sales"] for p in per_product.values()),
+    }])
+    _increment(db, DailyProductSalesRollup, ["sales_date", "product_id"], [
+        {"sales_date": sales_date, "product_id": product_id, **totals}
+        for product_id, totals in per_product.items()
+    ])
+
+
+def add_totals(db: Session, daily: dict, products: dict):
+    """Add precomputed totals onto the rollups in the caller's transaction.
+
+    daily maps a date to some of the DAILY_ZERO fields; products maps
+    (date, product_id) to quantity and total_sales. For bulk loaders that
+    write orders and invoices directly and tally them as they go.
+    """
+    if daily:
+        _increment(db, DailySalesRollup, ["sales_date"], [
+            {**DAILY_ZERO, **totals, "sales_date": as_date(d)} for d, totals in daily.items()
+        ])
+    if products:
+        _increment(db, DailyProductSalesRollup, ["sales_date", "product_id"], [
+            {"sales_date": as_date(d), "product_id": product_id, "quantity": 0, "total_sales": 0.0, **totals}
+            for (d, product_id), totals in products.items()
+        ])
+
+
+def rebuild_rollups(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> dict:
+    """Recompute the rollups for [start, end] (all dates if omitted) from the
+    orders, order_items and invoices tables. The caller commits."""
+
+    def in_range(query, column):
+        if start:
+            query = query.where(column >= start)
+        if end:
+            query = query.where(column <= end)
+        return query
+
+    for model in (DailySalesRollup, DailyProductSalesRollup):
+        stmt = delete(model)
+        if start:
+            stmt = stmt.where(model.sales_date >= start)
+        if end:
+            stmt = stmt.where(model.sales_date <= end)
+        db.exec(stmt)
+
+    daily: dict[date, dict] = defaultdict(lambda: dict(DAILY_ZERO))
+    products: dict[tuple[date, int], dict] = defaultdict(lambda: {"quantity": 0, "total_sales": 0.0})
+
+    order_totals = in_range(
+        select(Order.order_date, func.count(Order.id), func.sum(Order.quantity), func.sum(Order.total_price))
+        .group_by(Order.order_date),
+        Order.order_date,
+    )
+    for order_date, count, quantity, total in db.exec(order_totals):
+        row = daily[as_date(order_date)]
+        row.update(order_count=count, items_sold=quantity or 0, total_sales=total or 0.0)
+
+    item_totals = in_range(
+        select(Order.order_date, OrderItem.product_id, func.sum(OrderItem.quantity), func.sum(OrderItem.line_total))
+        .join(Order, Order.id == OrderItem.order_id)
+        .group_by(Order.order_date, OrderItem.product_id),
+        Order.order_date,
+    )
+    # Orders placed before order_items existed only carry their first product
+    legacy_totals = in_range(
+        select(Order.order_date, Order.product_id, func.sum(Order.quantity), func.sum(Order.total_price))
+        .where(~exists().where(OrderItem.order_id == Order.id))
+        .group_by(Order.order_date, Order.product_id),
+        Order.order_date,
+    )
+    for query in (item_totals, legacy_totals):
+        for order_date, product_id, quantity, total in db.exec(query):
+            row = products[(as_date(order_date), product_id)]
+            row["quantity"] += quantity or 0
+            row["total_sales"] += total or 0.0
+
+    invoice_totals = in_range(
+        select(Invoice.invoice_date, func.count(Invoice.id), func.sum(Invoice.total_amount), func.sum(Invoice.tax_amount))
+        .group_by(Invoice.invoice_date),
+        Invoice.invoice_date,
+    )
+    for invoice_date, count, total, tax in db.exec(invoice_totals):
+        daily[as_date(invoice_date)].update(invoice_count=count, invoice_total=total or 0.0, tax_total=tax or 0.0)
+
+    if daily:
+        db.exec(insert(DailySalesRollup), params=[{"sales_date": d, **totals} for d, totals in daily.items()])
+    if products:
+        db.exec(insert(DailyProductSalesRollup), params=[
+            {"sales_date": d, "product_id": product_id, **totals} for (d, product_id), totals in products.items()
+        ])
+    return {"days": len(daily), "product_days": len(products)}
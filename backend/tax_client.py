@@ -1,41 +1,207 @@
+import asyncio
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+import httpx
 import logging
 from dotenv import load_dotenv
 import os
+import time
+
+from services.logging_config import log_payload
+from services.metrics import TAX_IN_PROGRESS, observe_tax_call
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class TaxClient:
+    """HTTP client for the tax authority, created once and reused.
+
+    Keeps a pooled keep-alive requests.Session for sync callers and a lazily
+    created httpx.AsyncClient for async callers, both with the same pool size,
+    retry and timeout settings.
+    """
+
+    def __init__(self, pool_maxsize=10, retries=3, backoff_factor=1.0, timeout=10.0):
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES)
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._async_client = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            pool_maxsize=int(os.getenv("TAX_POOL_MAXSIZE", "10")),
+            retries=int(os.getenv("TAX_RETRIES", "3")),
+            backoff_factor=float(os.getenv("TAX_BACKOFF_FACTOR", "1.0")),
+            timeout=float(os.getenv("TAX_TIMEOUT", "10")),
+        )
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+            self._async_client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return self._async_client
+
+    @staticmethod
+    def _headers(tpin, bhf_id, device_serial_no):
+        headers = {
+            'Content-Type': 'application/json',
+            'x-api-key': os.getenv('POSTMAN_API_KEY'),
+            'TPIN': tpin,
+            'BhfId': bhf_id,
+            'DeviceSerialNo': device_serial_no
+        }
+        return {k: v for k, v in headers.items() if v is not None}
+
+    def _backoff(self, attempt):
+        # Same schedule as urllib3's Retry: no wait before the first retry
+        return 0 if attempt <= 1 else self.backoff_factor * (2 ** (attempt - 1))
+
+    def submit_invoice(self, invoice_data, api_url, tpin, bhf_id, device_serial_no):
+        full_url = api_url + '/trnsSales/saveSales'
+        headers = self._headers(tpin, bhf_id, device_serial_no)
+        start = time.perf_counter()
+        retries = 0
+        TAX_IN_PROGRESS.inc("saveSales")
+        try:
+            response = self.session.post(full_url, json=invoice_data, headers=headers, timeout=self.timeout)
+            # urllib3 hands back the Retry that was used, with one history entry per retry
+            retries = len(getattr(response.raw, "retries", None) and response.raw.retries.history or ())
+            response.raise_for_status()
+            result = response.json()
+            log_payload(logger, "Success", result)
+        except requests.HTTPError as http_err:
+            logger.error("HTTP error: %s", http_err)
+            result = {"status": "ERROR", "message": str(http_err), "status_code": http_err.response.status_code}
+        except requests.exceptions.RetryError:
+            retries = self.retries
+            logger.error("Max retries exceeded")
+            result = {"status": "ERROR", "message": f"Network failure after {self.retries} retries"}
+        except requests.exceptions.ConnectionError as err:
+            # Only raised once urllib3 has used up its retries on connection errors
+            retries = self.retries
+            logger.error("Unexpected: %s", err)
+            result = {"status": "ERROR", "message": str(err)}
+        except Exception as err:
+            logger.error("Unexpected: %s", err)
+            result = {"status": "ERROR", "message": str(err)}
+        finally:
+            TAX_IN_PROGRESS.dec("saveSales")
+        observe_tax_call("saveSales", time.perf_counter() - start, retries, result)
+        return result
+
+    async def _post_json_async(self, full_url, payload, headers):
+        endpoint = full_url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        TAX_IN_PROGRESS.inc(endpoint)
+        try:
+            result, retries = await self._post_json_with_retries(full_url, payload, headers)
+        finally:
+            TAX_IN_PROGRESS.dec(endpoint)
+        observe_tax_call(endpoint, time.perf_counter() - start, retries, result)
+        return result
+
+    async def _post_json_with_retries(self, full_url, payload, headers):
+        """POST with retries; returns (result, number of retries made)."""
+        attempt = 0
+        while True:
+            try:
+                response = await self.async_client.post(full_url, json=payload, headers=headers)
+                if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                response.raise_for_status()
+                return response.json(), attempt
+            except httpx.HTTPStatusError as http_err:
+                if http_err.response.status_code in RETRY_STATUSES:
+                    logger.error("Max retries exceeded")
+                    return {"status": "ERROR", "message": f"Network failure after {self.retries} retries"}, attempt
+                logger.error("HTTP error: %s", http_err)
+                return {"status": "ERROR", "message": str(http_err), "status_code": http_err.response.status_code}, attempt
+            except httpx.TransportError as err:
+                if attempt < self.retries:
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                logger.error("Max retries exceeded: %s", err)
+                return {"status": "ERROR", "message": f"Network failure after {self.retries} retries"}, attempt
+            except Exception as err:
+                logger.error("Unexpected: %s", err)
+                return {"status": "ERROR", "message": str(err)}, attempt
+
+    async def submit_invoice_async(self, invoice_data, api_url, tpin, bhf_id, device_serial_no):
+        headers = self._headers(tpin, bhf_id, device_serial_no)
+        result = await self._post_json_async(api_url + '/trnsSales/saveSales', invoice_data, headers)
+        if result.get("status") != "ERROR":
+            log_payload(logger, "Success", result)
+        return result
+
+    async def submit_invoices_batch_async(
+        self, invoices, api_url, tpin, bhf_id, device_serial_no, batch_size=50, max_concurrency=4
+    ):
+        """Submit invoices in batches to /trnsSales/saveSalesBatch.
+
+        Up to max_concurrency batches are in flight at once. Returns one result
+        per invoice, in input order; every invoice of a batch that fails as a
+        whole gets that batch's error.
+        """
+        headers = self._headers(tpin, bhf_id, device_serial_no)
+        full_url = api_url + '/trnsSales/saveSalesBatch'
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def send(batch):
+            async with semaphore:
+                result = await self._post_json_async(full_url, {"invoices": batch}, headers)
+            results = result.get("results") if isinstance(result, dict) else None
+            if not isinstance(results, list) or len(results) != len(batch):
+                failed = isinstance(result, dict) and result.get("status") == "ERROR"
+                error = result if failed else {
+                    "status": "ERROR", "message": "Malformed batch response"
+                }
+                return [error] * len(batch)
+            return results
+
+        batches = [invoices[i:i + batch_size] for i in range(0, len(invoices), batch_size)]
+        per_batch = await asyncio.gather(*(send(batch) for batch in batches))
+        results = [result for batch_results in per_batch for result in batch_results]
+        logger.info("Submitted %d invoices in %d batches", len(invoices), len(batches))
+        return results
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        self.session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+client = TaxClient.from_env()
+
 
 def submit_invoice(invoice_data, api_url, tpin, bhf_id, device_serial_no):
-    logging.info(f"Input type: {type(invoice_data)}")
-    session = requests.Session()
-    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-
-    headers = {
-        'Content-Type': 'application/json',
-        'x-api-key': os.getenv('POSTMAN_API_KEY'),
-        'TPIN': tpin,
-        'BhfId': bhf_id,
-        'DeviceSerialNo': device_serial_no
-    }
-
-    full_url = api_url + '/trnsSales/saveSales'
-    try:
-        response = session.post(full_url, json=invoice_data, headers=headers, timeout=10)
-        response.raise_for_status()
-        logging.info(f"Success: {response.json()}")
-        return response.json()
-    except requests.HTTPError as http_err:
-        logging.error(f"HTTP error: {http_err}")
-        return {"status": "ERROR", "message": str(http_err)}
-    except requests.RetryError:
-        logging.error("Max retries exceeded")
-        return {"status": "ERROR", "message": "Network failure after 3 retries"}
-    except Exception as err:
-        logging.error(f"Unexpected: {err}")
-        return {"status": "ERROR", "message": str(err)}
\ No newline at end of file
+    return client.submit_invoice(invoice_data, api_url, tpin, bhf_id, device_serial_no)
+
+
+async def submit_invoice_async(invoice_data, api_url, tpin, bhf_id, device_serial_no):
+    return await client.submit_invoice_async(invoice_data, api_url, tpin, bhf_id, device_serial_no)
+
+
+async def submit_invoices_batch_async(invoices, api_url, tpin, bhf_id, device_serial_no, batch_size=50, max_concurrency=4):
+    return await client.submit_invoices_batch_async(
+        invoices, api_url, tpin, bhf_id, device_serial_no, batch_size=batch_size, max_concurrency=max_concurrency
+    )
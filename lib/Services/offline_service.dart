@@ -1,5 +1,6 @@
 import 'dart:async';
 import 'dart:convert';
+import 'dart:math';
 import 'package:sqflite/sqflite.dart';
 import 'package:path/path.dart';
 import 'package:path_provider/path_provider.dart';
@@ -7,12 +8,24 @@ import '../Models/cart_item_model.dart';
 
 class OfflineService {
   static const _databaseName = "pos_offline.db";
-  static const _databaseVersion = 1;
+  static const _databaseVersion = 2;
   static const table = 'pending_orders';
 
   static const columnId = 'id';
   static const columnItems = 'items';
   static const columnCreatedAt = 'created_at';
+  static const columnIdempotencyKey = 'idempotency_key';
+
+  static final _random = Random.secure();
+
+  /// A random key for the backend's Idempotency-Key. The same key is sent on
+  /// every attempt at one order, so a retry never places it twice.
+  static String newIdempotencyKey() {
+    return List.generate(
+      16,
+      (_) => _random.nextInt(256).toRadixString(16).padLeft(2, '0'),
+    ).join();
+  }
 
   // Make this a singleton class.
   OfflineService._privateConstructor();
@@ -35,6 +48,7 @@ class OfflineService {
       path,
       version: _databaseVersion,
       onCreate: _onCreate,
+      onUpgrade: _onUpgrade,
     );
   }
 
@@ -44,18 +58,40 @@ class OfflineService {
           CREATE TABLE $table (
             $columnId INTEGER PRIMARY KEY AUTOINCREMENT,
             $columnItems TEXT NOT NULL,
-            $columnCreatedAt TEXT NOT NULL
+            $columnCreatedAt TEXT NOT NULL,
+            $columnIdempotencyKey TEXT
           )
           ''');
   }
 
+  Future _onUpgrade(Database db, int oldVersion, int newVersion) async {
+    if (oldVersion < 2) {
+      await db.execute(
+        'ALTER TABLE $table ADD COLUMN $columnIdempotencyKey TEXT',
+      );
+      // Orders queued before keys existed get one now, before their first replay
+      final rows = await db.query(table, columns: [columnId]);
+      for (final row in rows) {
+        await db.update(
+          table,
+          {columnIdempotencyKey: newIdempotencyKey()},
+          where: '$columnId = ?',
+          whereArgs: [row[columnId]],
+        );
+      }
+    }
+  }
+
   // Helper methods
 
-  Future<void> queueOrder(List<CartItem> items) async {
+  /// Queue an order for replay. Pass the idempotencyKey of a checkout that
+  /// may have reached the backend, so the replay cannot place it again.
+  Future<void> queueOrder(List<CartItem> items, {String? idempotencyKey}) async {
     final db = await instance.database;
     await db.insert(table, {
       columnItems: jsonEncode(items.map((item) => item.toJson()).toList()),
       columnCreatedAt: DateTime.now().toIso8601String(),
+      columnIdempotencyKey: idempotencyKey ?? newIdempotencyKey(),
     });
   }
 
@@ -20,6 +20,7 @@ class PosService extends ChangeNotifier {
   final Cart _cart = Cart();
 
   List<Product> _products = [];
+  String? _productsEtag; // catalog version of _products, for If-None-Match
   bool _isLoading = false;
   String? _lastError; // add
 
@@ -78,13 +79,20 @@ class PosService extends ChangeNotifier {
     try {
       final res = await _authenticatedRequest(
         '/api/products',
+        extraHeaders: {
+          if (_productsEtag != null && _products.isNotEmpty)
+            'If-None-Match': _productsEtag!,
+        },
       ).timeout(const Duration(seconds: 10));
 
-      if (res.statusCode >= 200 && res.statusCode < 300) {
+      if (res.statusCode == 304) {
+        // Catalog unchanged since the last fetch; keep the current list.
+      } else if (res.statusCode >= 200 && res.statusCode < 300) {
         final List data = json.decode(res.body) as List;
         _products = data
             .map((e) => Product.fromJson(e as Map<String, dynamic>))
             .toList();
+        _productsEtag = res.headers['etag'];
       } else {
         _lastError = 'Failed to load products (${res.statusCode})';
       }
@@ -153,6 +161,9 @@ class PosService extends ChangeNotifier {
     _lastError = null;
     notifyListeners();
 
+    // Sent with the order and kept if it gets queued, so a checkout whose
+    // response was lost is recognised by the backend when it is replayed
+    final idempotencyKey = OfflineService.newIdempotencyKey();
     try {
       final orderPayload = {
         'items': cart.items
@@ -169,6 +180,7 @@ class PosService extends ChangeNotifier {
         '/api/orders',
         method: 'POST',
         body: orderPayload,
+        extraHeaders: {'Idempotency-Key': idempotencyKey},
       ).timeout(const Duration(seconds: 15));
 
       // Accept any 2xx status as success (some backends return 201/204)
@@ -249,7 +261,10 @@ class PosService extends ChangeNotifier {
       }
     } on Exception {
       // If checkout fails due to network, queue it
-      await _offlineService.queueOrder(cart.items);
+      await _offlineService.queueOrder(
+        cart.items,
+        idempotencyKey: idempotencyKey,
+      );
       clearCart();
       _lastError = 'Network error. Order queued for later.';
       notifyListeners();
@@ -272,35 +287,50 @@ class PosService extends ChangeNotifier {
 
     if (!isOnline) return;
 
-    for (var orderData in pendingOrders) {
-      final items = (jsonDecode(orderData['items']) as List)
-          .map((itemJson) => CartItem.fromJson(itemJson))
-          .toList();
-
-      final orderPayload = {
-        'items': items
-            .map(
-              (item) => {
-                'product_id': item.product.id,
-                'quantity': item.quantity,
-              },
-            )
-            .toList(),
-      };
+    // Replay the queue through the batch endpoint, a page at a time, and
+    // clear only the orders the backend accepted.
+    const pageSize = 200;
+    for (var start = 0; start < pendingOrders.length; start += pageSize) {
+      final page = pendingOrders.skip(start).take(pageSize);
+      final orders = page.map((orderData) {
+        final items = (jsonDecode(orderData['items']) as List)
+            .map((itemJson) => CartItem.fromJson(itemJson))
+            .toList();
+        return {
+          'client_ref': orderData['id'].toString(),
+          'idempotency_key': orderData[OfflineService.columnIdempotencyKey],
+          'items': items
+              .map(
+                (item) => {
+                  'product_id': item.product.id,
+                  'quantity': item.quantity,
+                },
+              )
+              .toList(),
+        };
+      }).toList();
 
       try {
         final res = await _authenticatedRequest(
-          '/api/orders',
+          '/api/orders/batch',
           method: 'POST',
-          body: orderPayload,
+          body: {'orders': orders},
         );
-
-        if (res.statusCode >= 200 && res.statusCode < 300) {
-          await _offlineService.clearPendingOrder(orderData['id']);
+        if (res.statusCode < 200 || res.statusCode >= 300) return;
+
+        final results =
+            (json.decode(res.body) as Map<String, dynamic>)['results'] as List;
+        for (final result in results) {
+          if (result['status'] == 'accepted') {
+            await _offlineService.clearPendingOrder(
+              int.parse(result['client_ref'] as String),
+            );
+          }
+          // Anything else stays in the queue for the next sync attempt.
         }
-        // If it fails, we just leave it in the queue for the next sync attempt.
       } catch (_) {
-        // Network error during sync, leave it for next time.
+        // Network error during sync, leave the rest for next time.
+        return;
       }
     }
   }
@@ -378,6 +408,7 @@ class PosService extends ChangeNotifier {
   Future<void> logout() async {
     await _authService.deleteToken();
     _products = [];
+    _productsEtag = null;
     _cart.clear();
     _lastReceipt = null;
     _lastError = null;
@@ -392,11 +423,12 @@ class PosService extends ChangeNotifier {
     String endpoint, {
     String method = 'GET',
     Map<String, dynamic>? body,
+    Map<String, String> extraHeaders = const {},
   }) async {
     final token = await _authService.getToken();
     final base = await _resolveBaseUrl();
     final uri = Uri.parse('$base$endpoint');
-    final headers = ApiConfig.getHeaders(token);
+    final headers = {...ApiConfig.getHeaders(token), ...extraHeaders};
 
     switch (method) {
       case 'GET':